@@ -5,200 +5,151 @@
 # - Auto connect + auto reconnect (only if connection is lost)
 # - Protocol: "CMD@arg@...@\r\n", A_D, A_R, A_M
 # - Tkinter UI with buttons, frame count, status lamp, and log window
+# - Framing, transport and decoding live in the UI-independent csh package
+# - CSH_TIMING=1 times recv/parse/decode/dispatch/render; Ctrl+T or SIGUSR1 dumps the breakdown
+# - CSH_CAPTURE=path records the raw receive stream (read it with python -m csh.capture)
 
-import socket
-import threading
+import os
 import time
-import struct
+from collections import deque
 import tkinter as tk
-from tkinter import ttk
+import tkinter.font as tkfont
+from tkinter import filedialog, ttk
+
+from csh import AXIS_NAMES, FrameParser, MarkData, ReconnectingClient, ResultData, ShiftData, TextLine, decode_frame, frame_cmd
+from csh.timing import ANY_CMD, StageSink
 
 
 # ==============================
-# Frame Parser
+# Log Store
 # ==============================
-class FrameParser:
-    @staticmethod
-    def try_extract(src: bytearray):
-        """Try to extract one complete frame from buffer"""
-        if len(src) < 2:
-            return None
-
-        # Find CRLF
-        crlf = -1
-        for i in range(len(src) - 1):
-            if src[i] == 0x0D and src[i + 1] == 0x0A:
-                crlf = i
-                break
-        if crlf < 0:
-            return None
-
-        # Look for '@'
-        try:
-            at1 = src.index(ord('@'), 0, crlf)
-        except ValueError:
-            frame = bytes(src[:crlf + 2])
-            del src[:crlf + 2]
-            return frame
-
-        cmd = src[:at1].decode('ascii', errors='ignore')
-        if cmd in ('A_D', 'A_R'):
-            try:
-                at2 = src.index(ord('@'), at1 + 1)
-            except ValueError:
-                return None
-
-            try:
-                num_str = src[at1 + 1:at2].decode('ascii')
-                token = int(num_str)
-                if token < 0:
-                    del src[:1]
-                    return None
-            except Exception:
-                del src[:1]
-                return None
-
-            # Look for "@\r\n" tail
-            tail = src.find(b'@\r\n', at2)
-            if tail < 0:
-                return None
-            frame = bytes(src[:tail + 3])
-            del src[:tail + 3]
-            return frame
-
-        # Fallback: plain ASCII line
-        frame = bytes(src[:crlf + 2])
-        del src[:crlf + 2]
-        return frame
+class LogStore:
+    """Ring of the last max_lines log lines with O(1) indexed access.
+
+    The log widget only renders the visible window out of this store, so
+    memory and redraw cost stay bounded however long the session runs.
+    """
+    def __init__(self, max_lines: int = 100_000):
+        self.max_lines = max_lines
+        self._buf = []
+        self._start = 0
+        self.total = 0   # lines ever appended (total - len == dropped)
+
+    def __len__(self):
+        return len(self._buf)
+
+    def __getitem__(self, i: int) -> str:
+        return self._buf[(self._start + i) % len(self._buf)]
+
+    def append(self, line: str):
+        if len(self._buf) < self.max_lines:
+            self._buf.append(line)
+        else:
+            self._buf[self._start] = line
+            self._start = (self._start + 1) % self.max_lines
+        self.total += 1
+
+    def extend(self, lines):
+        for line in lines:
+            self.append(line)
+
+    def window(self, first: int, count: int):
+        """Lines [first, first+count) clamped to the store"""
+        return [self[i] for i in range(max(0, first), min(len(self._buf), first + count))]
+
+    def find(self, text: str, start: int = 0) -> int:
+        """Index of the next line containing text, wrapping around; -1 if none"""
+        n = len(self._buf)
+        for k in range(n):
+            i = (start + k) % n
+            if text in self[i]:
+                return i
+        return -1
+
+    def export(self, path: str):
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            for i in range(len(self._buf)):
+                f.write(self[i])
+
+    def clear(self):
+        self._buf = []
+        self._start = 0
 
 
 # ==============================
-# Reconnecting TCP Client
+# Result Detail View
 # ==============================
-class ReconnectingClient:
-    def __init__(self, log_cb, frame_cb):
-        self._log_cb = log_cb
-        self._frame_cb = frame_cb
-        self._sock = None
-        self._send_lock = threading.Lock()
-        self._stop_evt = threading.Event()
-        self._connected = False
-        self._host = '127.0.0.1'
-        self._port = 5000
-        self._thread = None
-
-    @property
-    def is_connected(self):
-        return self._connected
-
-    def start(self, host, port):
-        """Start connection with auto-reconnect"""
-        self._host = host.strip()
-        self._port = int(port)
-        if self._thread and self._thread.is_alive():
+class ResultView(tk.Toplevel):
+    """Paged per-frame table of recent A_R results.
+
+    Rows are only materialized for the page on screen, so opening a result
+    with a million frames costs one page of Treeview inserts.
+    """
+    PAGE_ROWS = 500
+
+    def __init__(self, master, results):
+        super().__init__(master)
+        self.title('A_R Results')
+        self.geometry('820x480')
+        self._results = list(results)
+        self._res = None
+        self._page = 0
+
+        self.lst = tk.Listbox(self, width=24, exportselection=False)
+        self.lst.pack(side=tk.LEFT, fill=tk.Y, padx=6, pady=6)
+        for seq, res in self._results:
+            self.lst.insert('end', f'#{seq} frames={len(res)}')
+        self.lst.bind('<<ListboxSelect>>', self._on_select)
+
+        right = ttk.Frame(self); right.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=6, pady=6)
+        nav = ttk.Frame(right); nav.pack(side=tk.BOTTOM, fill=tk.X)
+        ttk.Button(nav, text='< Prev', command=lambda: self._show_page(self._page - 1)).pack(side=tk.LEFT)
+        ttk.Button(nav, text='Next >', command=lambda: self._show_page(self._page + 1)).pack(side=tk.LEFT)
+        self.lbl_page = ttk.Label(nav, text=''); self.lbl_page.pack(side=tk.LEFT, padx=8)
+
+        cols = ('#',) + AXIS_NAMES
+        self.tree = ttk.Treeview(right, columns=cols, show='headings')
+        for c in cols:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=60 if c == '#' else 100, anchor='e')
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        vs = ttk.Scrollbar(right, orient='vertical', command=self.tree.yview)
+        self.tree.configure(yscrollcommand=vs.set); vs.pack(side=tk.RIGHT, fill=tk.Y)
+
+        if self._results:
+            self.lst.selection_set('end')
+            self._on_select()
+
+    def _on_select(self, _evt=None):
+        sel = self.lst.curselection()
+        if not sel:
             return
-        self._stop_evt.clear()
-        self._thread = threading.Thread(target=self._runner, daemon=True)
-        self._thread.start()
+        self._res = self._results[sel[0]][1]
+        self._show_page(0)
 
-    def stop(self):
-        """Stop connection"""
-        self._stop_evt.set()
-        try:
-            if self._sock:
-                self._sock.close()
-        except Exception:
-            pass
-        if self._thread:
-            self._thread.join(timeout=2.0)
-
-    # --- Send API ---
-    def send_cmd(self, cmd: str):
-        """Send command without arguments, always append '@\\r\\n'"""
-        if not cmd.endswith('@'):
-            cmd += '@'
-        if not cmd.endswith("\r\n"):
-            cmd += "\r\n"
-        self._send_raw(cmd.encode('ascii', errors='ignore'))
-
-    def send_ascii(self, cmd: str, *args: str):
-        """Send tokenized command: CMD@arg@...@\\r\\n"""
-        parts = [cmd or '']
-        for a in args:
-            parts.append('@')
-            parts.append(a or '')
-        parts.append('@\r\n')
-        data = ''.join(parts).encode('ascii', errors='ignore')
-        self._send_raw(data)
-
-    def _log(self, s):
-        try:
-            self._log_cb(s)
-        except Exception:
-            pass
-
-    def _send_raw(self, data: bytes):
-        try:
-            with self._send_lock:
-                if not self._sock:
-                    raise RuntimeError('Not connected')
-                self._sock.sendall(data)
-        except Exception as ex:
-            self._log(f'[TX] send error: {ex}\r\n')
-
-    # --- Main loop ---
-    def _runner(self):
-        backoff = 0.5
-        parser = FrameParser()
-        ring = bytearray()
-        while not self._stop_evt.is_set():
-            try:
-                self._log(f'[Client] Connecting to {self._host}:{self._port}...\r\n')
-                s = socket.create_connection((self._host, self._port), timeout=5.0)
-                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-                s.settimeout(1.0)
-                self._sock = s
-                self._connected = True
-                self._log('[Client] Connected\r\n')
-                backoff = 0.5
-                ring.clear()
-                while not self._stop_evt.is_set():
-                    try:
-                        chunk = s.recv(8192)
-                        if not chunk:
-                            self._log('[RX] remote closed\r\n')
-                            break
-                        ring.extend(chunk)
-                        while True:
-                            frame = parser.try_extract(ring)
-                            if frame is None:
-                                break
-                            try:
-                                self._frame_cb(frame)
-                            except Exception:
-                                import traceback; traceback.print_exc()
-                    except socket.timeout:
-                        continue
-            except Exception as ex:
-                self._log(f'[Client] connect/read error: {ex}\r\n')
-            finally:
-                self._connected = False
-                try:
-                    if self._sock:
-                        self._sock.close()
-                except Exception:
-                    pass
-                self._sock = None
-            if self._stop_evt.is_set():
-                break
-            time.sleep(backoff)
-            backoff = min(backoff * 2.0, 5.0)
+    def _show_page(self, page: int):
+        res = self._res
+        if res is None:
+            return
+        pages = max(1, -(-len(res) // self.PAGE_ROWS))
+        self._page = min(max(0, page), pages - 1)
+        first = self._page * self.PAGE_ROWS
+        self.tree.delete(*self.tree.get_children())
+        for i, row in enumerate(res.rows(first, self.PAGE_ROWS), first):
+            self.tree.insert('', 'end', values=(i,) + tuple(f'{v:.2f}' for v in row))
+        self.lbl_page.configure(text=f'page {self._page + 1}/{pages} ({len(res)} frames)')
 
 
 # ==============================
 # Tkinter UI
 # ==============================
 class App(tk.Tk):
+    LOG_TICK_MS = 50
+    LOG_MAX_LINES_PER_TICK = 2000
+    LOG_MAX_LINES = 100_000
+    RESULT_HISTORY = 20
+    RESULT_HISTORY_BYTES = 256 * 1024 * 1024   # axis data kept across the history
+
     def __init__(self):
         super().__init__()
         self.title('Python Client for C# Server')
@@ -228,93 +179,152 @@ class App(tk.Tk):
         self.btn_ds = ttk.Button(cmdfrm, text='D_S', width=10, command=self.send_ds)
         self.btn_ms = ttk.Button(cmdfrm, text='M_S', width=10, command=self.send_ms)
         self.btn_clear = ttk.Button(cmdfrm, text='Clear Log', width=10, command=self.clear_log)
-        for b in [self.btn_ps, self.btn_rc, self.btn_rs, self.btn_ds, self.btn_ms, self.btn_clear]:
+        self.btn_save = ttk.Button(cmdfrm, text='Save Log', width=10, command=self.save_log)
+        self.btn_results = ttk.Button(cmdfrm, text='Results', width=10, command=self.open_results)
+        for b in [self.btn_ps, self.btn_rc, self.btn_rs, self.btn_ds, self.btn_ms, self.btn_clear, self.btn_save, self.btn_results]:
             b.pack(pady=4)
+        self.txt_find = ttk.Entry(cmdfrm, width=12); self.txt_find.pack(pady=(12, 2))
+        self.txt_find.bind('<Return>', lambda e: self.find_log())
+        self.btn_find = ttk.Button(cmdfrm, text='Find', width=10, command=self.find_log); self.btn_find.pack(pady=4)
 
-        # Log window
+        # Log window: only the visible rows of self._log_store are rendered
         logfrm = ttk.Frame(self); logfrm.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=8, pady=8)
         self.txt_log = tk.Text(logfrm, wrap='none', font=('Consolas', 10), bg='black', fg='yellow')
         self.txt_log.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        vs = ttk.Scrollbar(logfrm, orient='vertical', command=self.txt_log.yview)
-        self.txt_log.configure(yscrollcommand=vs.set); vs.pack(side=tk.RIGHT, fill=tk.Y)
+        self.txt_log.tag_configure('hit', background='#404000')
+        self._log_vs = ttk.Scrollbar(logfrm, orient='vertical', command=self._on_log_yview)
+        self._log_vs.pack(side=tk.RIGHT, fill=tk.Y)
+        self._line_h = tkfont.Font(font=self.txt_log['font']).metrics('linespace')
+        self.txt_log.bind('<Configure>', lambda e: self._render_log())
+        self.txt_log.bind('<MouseWheel>', lambda e: self._on_log_yview('scroll', -e.delta // 120, 'units'))
+        self.txt_log.bind('<Button-4>', lambda e: self._on_log_yview('scroll', -3, 'units'))
+        self.txt_log.bind('<Button-5>', lambda e: self._on_log_yview('scroll', 3, 'units'))
+
+        # Log lines are queued from any thread and moved to the store on the Tk thread
+        self._log_q = deque()
+        self._log_store = LogStore(self.LOG_MAX_LINES)
+        self._log_top = 0
+        self._log_follow = True
+        self._log_hit = -1
+        self.after(self.LOG_TICK_MS, self._drain_log)
+
+        # Recent A_R results, opened on demand in a ResultView
+        self._results = deque()
+        self._results_bytes = 0
+        self._result_seq = 0
+
+        # Stage timing, off unless CSH_TIMING is set
+        self._timing = StageSink() if os.environ.get('CSH_TIMING') else None
+        if self._timing is not None:
+            self._timing.install_signal()
+            self.bind('<Control-t>', lambda e: self.log_timing())
 
         # Client
-        self.client = ReconnectingClient(self._on_log, self._on_frame)
+        self.client = ReconnectingClient(self._on_log, self._on_frame, zero_copy=True, timing=self._timing)
+        if os.environ.get('CSH_CAPTURE'):
+            self.client.start_capture(os.environ['CSH_CAPTURE'])
         self.after(500, self._tick_lamp)
         self.after(100, self.auto_connect)
 
     def _on_log(self, s: str):
+        """Queue one log line; safe to call from the network thread"""
         ts = time.strftime('%Y-%m-%d %H:%M:%S')
-        self.txt_log.insert('end', f'{ts}, {s}')
-        self.txt_log.see('end')
-
-    def _on_frame(self, frame: bytes):
-        """Parse and log received frame"""
-        crlf = frame.find(b'\r\n')
-        first_at = frame.find(b'@')
-        if first_at <= 0:
-            if crlf >= 0:
-                line = frame[:crlf].decode('ascii', errors='ignore')
-                self._on_log(f'RX: {line}\r\n')
-            return
-
-        cmd = frame[:first_at].decode('ascii', errors='ignore')
-
-        # --- Handle A_D ---
-        if cmd == 'A_D':
-            second_at = frame.find(b'@', first_at + 1)
-            if second_at < 0: return
-            s_count = frame[first_at + 1:second_at].decode('ascii', errors='ignore')
-            try:
-                cnt = int(s_count)
-            except: return
-            tail = frame.rfind(b'@\r\n')
-            payload = frame[second_at + 1:tail]
-            vals = struct.unpack('<' + 'd' * (len(payload)//8), payload)
-            self._on_log(f'A_D Receive (count={cnt}, doubles={len(vals)})\r\n')
-            for i, v in enumerate(vals):
+        self._log_q.append(f'{ts}, {s}')
+
+    def _drain_log(self):
+        """Move queued log lines into the store and redraw once per tick"""
+        q = self._log_q
+        n = min(len(q), self.LOG_MAX_LINES_PER_TICK)
+        if n:
+            store = self._log_store
+            dropped = store.total - len(store)
+            store.extend([q.popleft() for _ in range(n)])
+            shift = store.total - len(store) - dropped
+            self._log_top = max(0, self._log_top - shift)
+            if self._log_hit >= 0:
+                # -1 means no hit; a hit on a dropped line is gone, next search starts over
+                self._log_hit = self._log_hit - shift if self._log_hit >= shift else -1
+            self._render_log()
+        self.after(self.LOG_TICK_MS, self._drain_log)
+
+    def _log_rows(self) -> int:
+        return max(1, self.txt_log.winfo_height() // self._line_h)
+
+    def _render_log(self):
+        """Draw the visible window of the store into txt_log"""
+        if self._timing is not None:
+            t0 = time.perf_counter_ns()
+        store, rows = self._log_store, self._log_rows()
+        n = len(store)
+        if self._log_follow:
+            self._log_top = max(0, n - rows)
+        top = self._log_top
+        lines = store.window(top, rows)
+        self.txt_log.delete('1.0', 'end')
+        self.txt_log.insert('1.0', '\n'.join(l.rstrip('\r\n') for l in lines))
+        if top <= self._log_hit < top + rows:
+            row = self._log_hit - top + 1
+            self.txt_log.tag_add('hit', f'{row}.0', f'{row}.end')
+        if n:
+            self._log_vs.set(top / n, min(1.0, (top + rows) / n))
+        else:
+            self._log_vs.set(0.0, 1.0)
+        if self._timing is not None:
+            self._timing.add('render', ANY_CMD, time.perf_counter_ns() - t0)
+
+    def _on_log_yview(self, *args):
+        """Scrollbar / wheel handler: moves the window over the store"""
+        n, rows = len(self._log_store), self._log_rows()
+        if args[0] == 'moveto':
+            top = int(float(args[1]) * n)
+        else:
+            step = int(args[1]) * (rows if args[2] == 'pages' else 1)
+            top = self._log_top + step
+        self._log_top = min(max(0, top), max(0, n - rows))
+        self._log_follow = self._log_top >= n - rows
+        self._render_log()
+        return 'break'
+
+    def _on_frame(self, frame):
+        """Decode and log received frame (a view valid only during this call)"""
+        timing = self._timing
+        if timing is not None:
+            t0 = time.perf_counter_ns()
+        obj = decode_frame(frame)
+        if timing is not None:
+            timing.add('decode', frame_cmd(frame), time.perf_counter_ns() - t0)
+
+        if isinstance(obj, ShiftData):
+            self._on_log(f'A_D Receive (count={obj.count}, doubles={len(obj.values)})\r\n')
+            for i, v in enumerate(obj.values):
                 self._on_log(f'  [{i}] {v:.3f}\r\n')
+        elif isinstance(obj, ResultData):
+            # One summary line per result; rows are shown in ResultView on demand
+            self._result_seq += 1
+            self._keep_result(obj)
+            stats = ' '.join(f'{name}[{lo:.2f}/{hi:.2f}/{avg:.2f}]'
+                             for name, (lo, hi, avg) in zip(AXIS_NAMES, obj.axis_stats()))
+            self._on_log(f'A_R Receive #{self._result_seq} (frames={len(obj)}, fps={obj.fps:.2f}, '
+                         f'LED={obj.led_left:.2f}/{obj.led_right:.2f}, test={obj.test_time:.2f}s) '
+                         f'min/max/mean {stats}\r\n')
+        elif isinstance(obj, MarkData):
+            self._on_log(f'A_M Receive (Mark ID={obj.mark_id})\r\n')
+        elif isinstance(obj, TextLine):
+            self._on_log(f'RX: {obj.text}\r\n')
+
+    def _keep_result(self, obj):
+        """Copy a result into the history, bounded by count and bytes"""
+        size = len(obj) * FrameParser.A_R_FRAME_BYTES
+        if size > self.RESULT_HISTORY_BYTES:
+            self._on_log(f'[Results] #{self._result_seq} not kept ({size / 1e6:.0f} MB over the '
+                         f'{self.RESULT_HISTORY_BYTES / 1e6:.0f} MB history limit)\r\n')
             return
-
-        # --- Handle A_R ---
-        if cmd == 'A_R':
-            second_at = frame.find(b'@', first_at + 1)
-            if second_at < 0: return
-            s_cnt = frame[first_at + 1:second_at].decode('ascii', errors='ignore')
-            try:
-                frm_cnt = int(s_cnt)
-            except: return
-            tail = frame.rfind(b'@\r\n')
-            payload = frame[second_at + 1:tail]
-            if len(payload) < 44: return
-            off = 0
-            def read_i64(): nonlocal off; v=struct.unpack_from('<q', payload, off)[0]; off+=8; return v
-            def read_i32(): nonlocal off; v=struct.unpack_from('<i', payload, off)[0]; off+=4; return v
-            def read_d(): nonlocal off; v=struct.unpack_from('<d', payload, off)[0]; off+=8; return v
-            s_time = read_i64(); frameCt = read_i32(); fps = read_d(); ledL = read_d(); ledR = read_d(); testT = read_d()
-            X = [read_d() for _ in range(frm_cnt)]
-            Y = [read_d() for _ in range(frm_cnt)]
-            Z = [read_d() for _ in range(frm_cnt)]
-            TX = [read_d() for _ in range(frm_cnt)]
-            TY = [read_d() for _ in range(frm_cnt)]
-            TZ = [read_d() for _ in range(frm_cnt)]
-            self._on_log(f'A_R Receive (frames={frm_cnt}, fps={fps:.2f}, test={testT:.2f}s)\r\n')
-            for i in range(frm_cnt):
-                self._on_log(f'  [{i}] X={X[i]:.2f}, Y={Y[i]:.2f}, Z={Z[i]:.2f}, TX={TX[i]:.2f}, TY={TY[i]:.2f}, TZ={TZ[i]:.2f}\r\n')
-            return
-
-        # --- Handle A_M ---
-        if cmd == 'A_M':
-            second_at = frame.find(b'@', first_at + 1)
-            if second_at < 0: return
-            mark_id = frame[first_at + 1:second_at].decode('ascii', errors='ignore')
-            self._on_log(f'A_M Receive (Mark ID={mark_id})\r\n')
-            return
-
-        # --- Fallback ASCII ---
-        if crlf >= 0:
-            line = frame[:crlf].decode('ascii', errors='ignore')
-            self._on_log(f'RX: {line}\r\n')
+        results = self._results
+        while results and (len(results) >= self.RESULT_HISTORY
+                           or self._results_bytes + size > self.RESULT_HISTORY_BYTES):
+            self._results_bytes -= len(results.popleft()[1]) * FrameParser.A_R_FRAME_BYTES
+        results.append((self._result_seq, obj.copy()))
+        self._results_bytes += size
 
     def _tick_lamp(self):
         fill = 'blue' if self.client.is_connected else 'red'
@@ -335,10 +345,41 @@ class App(tk.Tk):
     def send_rc(self): self.client.send_ascii('R_C', self.txt_frames.get().strip() or '1')
     def send_ds(self): self.client.send_ascii('D_S')
     def send_ms(self): self.client.send_ascii('M_S')
-    def clear_log(self): self.txt_log.delete('1.0', 'end')
+    def clear_log(self):
+        self._log_store.clear()
+        self._log_top, self._log_follow, self._log_hit = 0, True, -1
+        self._render_log()
+
+    def find_log(self):
+        """Jump to the next log line containing the search text"""
+        text = self.txt_find.get()
+        if not text:
+            return
+        i = self._log_store.find(text, self._log_hit + 1)
+        if i < 0:
+            return
+        rows = self._log_rows()
+        self._log_hit = i
+        self._log_top = min(max(0, i - rows // 2), max(0, len(self._log_store) - rows))
+        self._log_follow = False
+        self._render_log()
+
+    def log_timing(self):
+        """Write the stage timing breakdown into the log"""
+        for line in self._timing.report().splitlines():
+            self._on_log(line + '\r\n')
+
+    def open_results(self):
+        ResultView(self, self._results)
+
+    def save_log(self):
+        """Export every line held in the store"""
+        path = filedialog.asksaveasfilename(defaultextension='.txt', filetypes=[('Text', '*.txt'), ('All', '*.*')])
+        if path:
+            self._log_store.export(path)
 
     def on_close(self):
-        try: self.client.stop()
+        try: self.client.close()
         finally: self.destroy()
 
 
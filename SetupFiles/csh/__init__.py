@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+#
+# UI-independent client library for the C# CSH server
+# - csh.protocol  : framing (RxBuffer, FrameParser) and command encoding
+# - csh.transport : ReconnectingClient (one thread per connection)
+# - csh.aio       : AsyncClient (asyncio, many connections per loop)
+# - csh.pool      : StationPool (many stations on one selector thread)
+# - csh.decode    : typed decoding of A_R / A_D / A_M frames
+# - csh.metrics   : counters, gauges, histograms; Prometheus export over HTTP
+# - csh.timing    : per-stage timing hooks (StageSink)
+# - csh.capture   : raw receive stream capture file writer/reader
+# - csh.continuous: pipelined R_C throughput driver
+# - csh.emulator  : asyncio emulator of the C# CSHServer
+# - csh.bench_parser: FrameParser throughput benchmark (python -m csh.bench_parser)
+# - csh.bench_latency: R_S -> A_R round-trip latency benchmark (python -m csh.bench_latency)
+
+from .protocol import RESPONSE_FOR, FrameParser, RxBuffer, check_request, encode_ascii, encode_cmd, frame_cmd
+from .decode import (
+    A_R_HEADER, AXIS_NAMES, MarkData, ResultData, ShiftData, TextLine,
+    decode_a_d, decode_a_r, decode_frame,
+)
+from .transport import ReconnectingClient
+
+# Imported on first access: these pull in asyncio, http.server or numpy, and
+# loading the CLI modules here would make `python -m csh.emulator` warn
+_LAZY = {
+    'AsyncClient': 'aio', 'StationPool': 'pool', 'ContinuousDriver': 'continuous',
+    'EmulatorServer': 'emulator', 'Impairment': 'emulator',
+    'Counter': 'metrics', 'Gauge': 'metrics', 'Histogram': 'metrics',
+    'MetricsServer': 'metrics', 'Registry': 'metrics', 'StageSink': 'timing',
+    'CaptureReader': 'capture', 'CaptureWriter': 'capture',
+}
+
+
+def __getattr__(name):
+    mod = _LAZY.get(name)
+    if mod is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    from importlib import import_module
+    value = getattr(import_module(f'.{mod}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
+
+__all__ = [
+    'RESPONSE_FOR', 'FrameParser', 'RxBuffer', 'check_request', 'encode_ascii', 'encode_cmd', 'frame_cmd',
+    'A_R_HEADER', 'AXIS_NAMES', 'MarkData', 'ResultData', 'ShiftData', 'TextLine',
+    'decode_a_d', 'decode_a_r', 'decode_frame',
+    'ReconnectingClient', 'AsyncClient', 'StationPool', 'ContinuousDriver',
+    'EmulatorServer', 'Impairment',
+    'Counter', 'Gauge', 'Histogram', 'MetricsServer', 'Registry', 'StageSink',
+    'CaptureReader', 'CaptureWriter',
+]
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+#
+# asyncio transport for the C# CSH server
+# - Same reconnect semantics and send API as ReconnectingClient
+# - One event loop can drive many stations without a thread per connection
+# - Frames go to frame_cb, or to an async iterator (frames()) when no callback is given
+
+import asyncio
+import socket
+from collections import deque
+
+from .decode import decode_frame
+from .protocol import FrameParser, RxBuffer, check_request, encode_ascii, encode_cmd, frame_cmd
+
+
+# ==============================
+# Protocol
+# ==============================
+class _FrameProtocol(asyncio.Protocol):
+    """Feeds received bytes through the incremental parser"""
+    def __init__(self, client):
+        self._client = client
+        self._ring = RxBuffer()
+        self._parser = FrameParser()
+        self.closed = asyncio.get_running_loop().create_future()
+
+    def connection_made(self, transport):
+        sock = transport.get_extra_info('socket')
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def data_received(self, data):
+        self._ring.extend(data)
+        while True:
+            frame = self._parser.try_extract(self._ring)
+            if frame is None:
+                break
+            self._client._dispatch(frame)
+
+    def connection_lost(self, exc):
+        if not self.closed.done():
+            self.closed.set_result(exc)
+
+
+# ==============================
+# Reconnecting asyncio Client
+# ==============================
+class AsyncClient:
+    STALE_REQUEST_GRACE = 10.0   # seconds a timed-out request waits for its late response
+
+    def __init__(self, log_cb=None, frame_cb=None, queue_size: int = 0):
+        self._log_cb = log_cb
+        self._frame_cb = frame_cb
+        self._queue = asyncio.Queue(queue_size) if frame_cb is None else None
+        self._transport = None
+        self._task = None
+        self._connected = asyncio.Event()
+        self._host = '127.0.0.1'
+        self._port = 5000
+        # Outstanding requests per response cmd, oldest first
+        self._pending = {}
+
+    @property
+    def is_connected(self):
+        return self._connected.is_set()
+
+    async def wait_connected(self, timeout: float = None):
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+    def start(self, host, port):
+        """Start connection with auto-reconnect (call from the event loop)"""
+        self._host = host.strip()
+        self._port = int(port)
+        if self._task and not self._task.done():
+            return
+        self._task = asyncio.get_running_loop().create_task(self._runner())
+
+    async def stop(self):
+        """Stop connection"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # --- Send API ---
+    def send_cmd(self, cmd: str):
+        """Send command without arguments, always append '@\\r\\n'"""
+        return self._send_raw(encode_cmd(cmd))
+
+    def send_ascii(self, cmd: str, *args: str):
+        """Send tokenized command: CMD@arg@...@\\r\\n"""
+        return self._send_raw(encode_ascii(cmd, *args))
+
+    def request(self, cmd: str, *args, timeout: float = None) -> asyncio.Future:
+        """Send a request and return a Future for its decoded response.
+
+        Matching follows ReconnectingClient.request(): responses resolve the
+        oldest outstanding request expecting that frame type, and a timed-out
+        request keeps its slot for STALE_REQUEST_GRACE seconds before it is
+        dropped. R_S/R_C counts the server would reject raise ValueError.
+        """
+        resp = check_request(cmd, args)
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        if not self._send_raw(encode_ascii(cmd, *args)):
+            fut.set_exception(ConnectionError(f'{cmd} not sent'))
+            return fut
+        self._pending.setdefault(resp, deque()).append(fut)
+        if timeout:
+            loop.call_later(timeout, self._expire, resp, fut)
+        return fut
+
+    async def frames(self):
+        """Async iterator over received frames (only without frame_cb)"""
+        if self._queue is None:
+            raise RuntimeError('frames are delivered to frame_cb')
+        while True:
+            yield await self._queue.get()
+
+    def _log(self, s):
+        if self._log_cb is None:
+            return
+        try:
+            self._log_cb(s)
+        except Exception:
+            pass
+
+    def _send_raw(self, data: bytes) -> bool:
+        if self._transport is None or self._transport.is_closing():
+            self._log('[TX] send error: Not connected\r\n')
+            return False
+        self._transport.write(data)
+        return True
+
+    def _expire(self, resp: str, fut):
+        if not fut.done():
+            fut.set_exception(TimeoutError('no response'))
+        asyncio.get_running_loop().call_later(self.STALE_REQUEST_GRACE, self._drop_stale, resp, fut)
+
+    def _drop_stale(self, resp: str, fut):
+        """Free the slot of a request whose late response never came"""
+        q = self._pending.get(resp)
+        if q and fut in q:
+            q.remove(fut)
+            self._log(f'[REQ] timed-out {resp} request dropped, '
+                      f'no response within {self.STALE_REQUEST_GRACE:g}s\r\n')
+
+    def _dispatch(self, frame: bytes):
+        if self._pending:
+            q = self._pending.get(frame_cmd(frame))
+            if q:
+                fut = q.popleft()
+                if not fut.done():
+                    fut.set_result(decode_frame(frame))
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self._log('[RX] frame queue full, frame dropped\r\n')
+            return
+        try:
+            self._frame_cb(frame)
+        except Exception:
+            import traceback; traceback.print_exc()
+
+    def _fail_requests(self, ex: Exception):
+        pending, self._pending = self._pending, {}
+        for q in pending.values():
+            for fut in q:
+                if not fut.done():
+                    fut.set_exception(ex)
+
+    # --- Main loop ---
+    async def _runner(self):
+        loop = asyncio.get_running_loop()
+        backoff = 0.5
+        while True:
+            proto = None
+            try:
+                self._log(f'[Client] Connecting to {self._host}:{self._port}...\r\n')
+                self._transport, proto = await asyncio.wait_for(
+                    loop.create_connection(lambda: _FrameProtocol(self), self._host, self._port), 5.0)
+                self._connected.set()
+                self._log('[Client] Connected\r\n')
+                backoff = 0.5
+                exc = await proto.closed
+                self._log(f'[RX] remote closed{f": {exc}" if exc else ""}\r\n')
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                self._log(f'[Client] connect/read error: {ex}\r\n')
+            finally:
+                self._connected.clear()
+                if self._transport is not None:
+                    self._transport.close()
+                    self._transport = None
+                if self._pending:
+                    self._fail_requests(ConnectionError('connection lost'))
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2.0, 5.0)
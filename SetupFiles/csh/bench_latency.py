@@ -0,0 +1,302 @@
+# -*- coding: utf-8 -*-
+#
+# End-to-end R_S -> A_R latency benchmark against an in-process emulator
+# - Emulator on loopback TCP or a Unix socket, in its own event loop thread
+# - One ReconnectingClient per concurrent requester, one request in flight each
+# - Sweeps frame counts x concurrency, reports p50/p90/p99/max per stage
+# - Stages: send, server, wire, parse, decode (+ total), all perf_counter_ns
+#
+# Usage: python -m csh.bench_latency [--frames 1,1000,100000] [--concurrency 1,4]
+#        [--requests 200] [--unix PATH] [--json OUT]
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import tempfile
+import threading
+import time
+
+from .decode import ResultData, decode_frame
+from .emulator import EmulatorServer
+from .transport import ReconnectingClient
+
+STAGES = ('send', 'server', 'wire', 'parse', 'decode', 'total')
+
+
+# ==============================
+# Timed Emulator
+# ==============================
+class _TimedEmulator(EmulatorServer):
+    """EmulatorServer that timestamps tagged requests (R_S@n@tag@).
+
+    The C# server ignores tokens after the frame count, so the tag does not
+    change the response. t_in is taken once the server has parsed the
+    request, t_out right before the response is written to the transport
+    (the client thread may already be reading when the write returns).
+    """
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.marks = {}
+        self._t_out = 0
+
+    def _send(self, writer, *parts: bytes):
+        self._t_out = time.perf_counter_ns()
+        super()._send(writer, *parts)
+
+    async def _on_frame(self, writer, frame: bytes):
+        t_in = time.perf_counter_ns()
+        await super()._on_frame(writer, frame)
+        arry = frame.split(b'@')
+        if len(arry) > 3 and arry[0] == b'R_S':
+            self.marks[arry[2].decode('ascii')] = (t_in, self._t_out)
+
+
+class _EmulatorThread:
+    """Runs a _TimedEmulator on a private event loop"""
+    def __init__(self, unix_path: str = None):
+        self.loop = asyncio.new_event_loop()
+        self.server = _TimedEmulator(port=0, unix_path=unix_path)
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result(5.0)
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result(5.0)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=2.0)
+        self.loop.close()
+
+
+# ==============================
+# Requester
+# ==============================
+class _Requester:
+    """One connection sending R_S back to back, timing each response"""
+    def __init__(self, name: str, host: str, port: int):
+        self.name = name
+        self.samples = []   # (tag, t_send, t_rx, t_dec, parse_ns)
+        self.errors = 0
+        self._done = threading.Event()
+        self._t = None
+        # Responses carry no tag: after a timeout the late A_R is still on its way,
+        # so that many responses on the same connection are discarded
+        self._lock = threading.Lock()
+        self._stale = 0
+        self._stale_conn = 0
+        self._parse = 0     # live try_extract() ns since the last send (see add)
+        self.client = ReconnectingClient(lambda s: None, self._on_frame, zero_copy=True, timing=self)
+        self.client.start(host, port)
+
+    def wait_connected(self, timeout: float = 10.0):
+        t_end = time.monotonic() + timeout
+        while not self.client.is_connected:
+            if time.monotonic() > t_end:
+                raise ConnectionError(f'{self.name}: cannot connect to the emulator')
+            time.sleep(0.01)
+
+    def add(self, stage: str, cmd: str, ns: int):
+        """timing= sink of the client: sums parse time for the one request in flight"""
+        if stage == 'parse':
+            self._parse += ns
+
+    def _on_frame(self, frame):
+        """Decode path of App._on_frame, minus the Tk log"""
+        t_rx = time.perf_counter_ns()
+        obj = decode_frame(frame)
+        if not isinstance(obj, ResultData):
+            return
+        kept = obj.copy()
+        kept.axis_stats()
+        t = (t_rx, time.perf_counter_ns(), self._parse)
+        with self._lock:
+            if self._stale and self._stale_conn == self.client._conn_id:
+                self._stale -= 1
+                return
+            self._t = t
+            self._done.set()
+
+    def run(self, frame_count: int, requests: int, warmup: int, timeout: float = 10.0):
+        for i in range(warmup + requests):
+            tag = f'{self.name}-{frame_count}-{i}'
+            self._done.clear()
+            self._parse = 0
+            t_send = time.perf_counter_ns()
+            if not self.client.send_ascii('R_S', frame_count, tag):
+                self.errors += 1
+                continue
+            if not self._done.wait(timeout):
+                self.errors += 1
+                with self._lock:
+                    if self._done.is_set():
+                        # Arrived between the timeout and here; it is this request's
+                        self._done.clear()
+                    else:
+                        conn = self.client._conn_id
+                        self._stale = self._stale + 1 if self._stale_conn == conn else 1
+                        self._stale_conn = conn
+                continue
+            t_rx, t_dec, parse = self._t
+            if i >= warmup:
+                self.samples.append((tag, t_send, t_rx, t_dec, parse))
+
+    def stop(self):
+        self.client.close()
+
+
+# ==============================
+# Stage Breakdown
+# ==============================
+def _stages(sample, marks: dict) -> dict:
+    tag, t_send, t_rx, t_dec, parse = sample
+    t_in, t_out = marks[tag]
+    # parse is try_extract() time measured live in the receive loop through the
+    # client's timing hook; it runs between reads, so wire is what is left
+    parse = min(parse, max(0, t_rx - t_out))
+    return {
+        'send': t_in - t_send,
+        'server': t_out - t_in,
+        'wire': max(0, t_rx - t_out - parse),
+        'parse': parse,
+        'decode': t_dec - t_rx,
+        'total': t_dec - t_send,
+    }
+
+
+def _percentile(sorted_vals, q: float):
+    """Nearest-rank percentile"""
+    if not sorted_vals:
+        return 0
+    return sorted_vals[min(len(sorted_vals) - 1, max(0, math.ceil(q * len(sorted_vals)) - 1))]
+
+
+def summarize(rows: list) -> dict:
+    """Per stage p50/p90/p99/max in microseconds"""
+    out = {}
+    for stage in STAGES:
+        vals = sorted(r[stage] for r in rows)
+        out[stage] = {
+            'p50_us': _percentile(vals, 0.50) / 1e3,
+            'p90_us': _percentile(vals, 0.90) / 1e3,
+            'p99_us': _percentile(vals, 0.99) / 1e3,
+            'max_us': (vals[-1] if vals else 0) / 1e3,
+        }
+    return out
+
+
+# ==============================
+# Sweep
+# ==============================
+def run_point(emu: _EmulatorThread, host: str, port: int, frame_count: int, concurrency: int,
+              requests: int, warmup: int) -> dict:
+    reqs = [_Requester(f'c{i}', host, port) for i in range(concurrency)]
+    try:
+        for r in reqs:
+            r.wait_connected()
+        threads = [threading.Thread(target=r.run, args=(frame_count, requests, warmup))
+                   for r in reqs]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+    finally:
+        for r in reqs:
+            r.stop()
+    marks = emu.server.marks
+    rows = [_stages(s, marks) for r in reqs for s in r.samples]
+    marks.clear()
+    return {
+        'frame_count': frame_count,
+        'concurrency': concurrency,
+        'samples': len(rows),
+        'errors': sum(r.errors for r in reqs),
+        'elapsed_s': elapsed,
+        'results_per_s': len(rows) / elapsed if elapsed else 0.0,
+        'stages': summarize(rows),
+    }
+
+
+def run_sweep(frame_counts, concurrencies, requests: int = 200, warmup: int = 10,
+              unix_path: str = None, progress=None) -> dict:
+    emu = _EmulatorThread(unix_path).start()
+    if unix_path:
+        host, port = 'unix:' + unix_path, 0
+    else:
+        host, port = '127.0.0.1', emu.server.port
+    points = []
+    try:
+        for n in frame_counts:
+            for c in concurrencies:
+                pt = run_point(emu, host, port, n, c, requests, warmup)
+                points.append(pt)
+                if progress is not None:
+                    progress(pt)
+    finally:
+        emu.stop()
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'transport': 'unix' if unix_path else 'tcp-loopback',
+            'requests': requests,
+            'warmup': warmup,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'points': points,
+    }
+
+
+def _format_point(pt: dict) -> str:
+    lines = [f"frames={pt['frame_count']} concurrency={pt['concurrency']}: "
+             f"{pt['samples']} samples, {pt['errors']} errors, {pt['results_per_s']:.1f} results/s"]
+    for stage in STAGES:
+        s = pt['stages'][stage]
+        lines.append(f"  {stage:<7} p50 {s['p50_us']:10.1f}  p90 {s['p90_us']:10.1f}  "
+                     f"p99 {s['p99_us']:10.1f}  max {s['max_us']:10.1f} us")
+    return '\n'.join(lines)
+
+
+def _int_list(s: str):
+    return [int(v) for v in s.split(',') if v.strip()]
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='R_S -> A_R round-trip latency benchmark')
+    ap.add_argument('--frames', type=_int_list, default=[1, 100, 1000, 10000, 100000],
+                    help='comma separated frame counts')
+    ap.add_argument('--concurrency', type=_int_list, default=[1, 4, 16],
+                    help='comma separated numbers of concurrent connections')
+    ap.add_argument('--requests', type=int, default=200, help='timed requests per connection')
+    ap.add_argument('--warmup', type=int, default=10, help='untimed requests per connection')
+    ap.add_argument('--unix', nargs='?', const='', default=None,
+                    help='use a Unix socket (optionally at PATH) instead of TCP loopback')
+    ap.add_argument('--json', default=None, help='write the report to this file')
+    args = ap.parse_args(argv)
+
+    unix_path, tmp_dir = args.unix, None
+    if unix_path == '':
+        tmp_dir = tempfile.mkdtemp(prefix='csh-bench-')
+        unix_path = os.path.join(tmp_dir, 'emu.sock')
+    try:
+        report = run_sweep(args.frames, args.concurrency, args.requests, args.warmup, unix_path,
+                           progress=lambda pt: print(_format_point(pt), flush=True))
+    finally:
+        if unix_path and os.path.exists(unix_path):
+            os.unlink(unix_path)
+        if tmp_dir:
+            os.rmdir(tmp_dir)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'report written to {args.json}')
+
+
+if __name__ == '__main__':
+    main()
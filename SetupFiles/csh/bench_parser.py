@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+#
+# FrameParser throughput benchmark
+# - Replays synthetic server streams (A_R of 1..1M frames, A_D, A_M, text lines)
+# - Feeds them in chunks of 1 byte .. 1 MB, through extend() or write_view()/commit()
+# - Reports MB/s, frames/s and allocations per frame, optionally as JSON
+# - Compares against a stored baseline and exits 1 on a regression
+#
+# Usage: python -m csh.bench_parser [--quick] [--json OUT] [--baseline FILE] [--tolerance 0.10]
+
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import time
+
+from .emulator import _MARK_SHIFT, _TAIL, make_save_result
+from .protocol import FrameParser, RxBuffer
+
+CHUNK_SIZES = (1, 64, 1460, 64 * 1024, 1024 * 1024)
+MODES = ('copy', 'views')
+
+
+# ==============================
+# Synthetic Streams
+# ==============================
+def a_r_frame(frm_cnt: int) -> bytes:
+    return f'A_R@{frm_cnt}@'.encode('ascii') + make_save_result(frm_cnt, s_time=0) + _TAIL
+
+
+def a_d_frame() -> bytes:
+    return b'A_D@6@' + _MARK_SHIFT + _TAIL
+
+
+A_M_FRAME = b'A_M@3@\r\n'
+TEXT_LINES = (b'P_S Recieve\r\n', b'Base Up\r\n', b'Pogo Pin load\r\n', b'Mark ID : 3 Send\r\n')
+
+
+def _repeat(frame: bytes, target_bytes: int):
+    return [frame] * max(1, target_bytes // len(frame))
+
+
+def _mixed(target_bytes: int, seed: int = 1):
+    """What a station sends during a run: results of varied size between short frames"""
+    rng = random.Random(seed)
+    results = {n: a_r_frame(n) for n in (1, 10, 100, 1000, 10000)}
+    a_d = a_d_frame()
+    frames, size = [], 0
+    while size < target_bytes:
+        r = rng.random()
+        if r < 0.4:
+            f = results[rng.choice(tuple(results))]
+        elif r < 0.6:
+            f = a_d
+        elif r < 0.7:
+            f = A_M_FRAME
+        else:
+            f = rng.choice(TEXT_LINES)
+        frames.append(f)
+        size += len(f)
+    return frames
+
+
+def _text(target_bytes: int, seed: int = 1):
+    rng = random.Random(seed)
+    frames, size = [], 0
+    while size < target_bytes:
+        f = A_M_FRAME if rng.random() < 0.2 else rng.choice(TEXT_LINES)
+        frames.append(f)
+        size += len(f)
+    return frames
+
+
+# name -> (builder(target_bytes) -> list of frames, default target bytes)
+STREAMS = {
+    'text': (_text, 2 * 1024 * 1024),
+    'mixed': (_mixed, 16 * 1024 * 1024),
+    'a_d': (lambda n: _repeat(a_d_frame(), n), 4 * 1024 * 1024),
+    'a_r_1': (lambda n: _repeat(a_r_frame(1), n), 4 * 1024 * 1024),
+    'a_r_1k': (lambda n: _repeat(a_r_frame(1000), n), 32 * 1024 * 1024),
+    'a_r_100k': (lambda n: _repeat(a_r_frame(100_000), n), 64 * 1024 * 1024),
+    'a_r_1m': (lambda n: _repeat(a_r_frame(1_000_000), n), 48 * 1024 * 1024),
+}
+
+
+# ==============================
+# Runner
+# ==============================
+def _feed(stream: memoryview, chunk: int, mode: str, sink=None) -> int:
+    """Push the stream through a fresh buffer/parser like the receive loops do"""
+    ring = RxBuffer()
+    parser = FrameParser(views=(mode == 'views'))
+    extract = parser.try_extract
+    frames = 0
+    total = len(stream)
+    for off in range(0, total, chunk):
+        data = stream[off:off + chunk]
+        if mode == 'views':
+            # ReconnectingClient(zero_copy=True): recv_into the buffer tail
+            n = len(data)
+            ring.write_view(n)[:n] = data
+            ring.commit(n)
+        else:
+            ring.extend(data)
+        while True:
+            frame = extract(ring)
+            if frame is None:
+                break
+            frames += 1
+            if sink is not None:
+                sink.append(frame)
+    return frames
+
+
+def _prefix(frames: list, limit: int):
+    """(bytes, frames) of the longest whole-frame prefix within limit"""
+    size = count = 0
+    for f in frames:
+        if size + len(f) > limit:
+            break
+        size += len(f)
+        count += 1
+    return size, count
+
+
+def _allocs_per_frame(part: memoryview, chunk: int, mode: str) -> float:
+    """Allocated blocks left per frame when every returned frame is kept alive.
+
+    Temporaries freed inside try_extract() are not counted; what remains is
+    the frame object itself plus anything the parser retains per frame
+    (including buffer growth, which large frames amortize poorly).
+    """
+    kept = []
+    gc.collect()
+    gc.disable()
+    try:
+        before = sys.getallocatedblocks()
+        frames = _feed(part, chunk, mode, kept)
+        after = sys.getallocatedblocks()
+    finally:
+        gc.enable()
+    # The list's own storage is not a per-frame cost of the parser
+    blocks = after - before - (1 if kept else 0)
+    del kept
+    return blocks / frames if frames else 0.0
+
+
+def run_case(name: str, frames: list, chunk: int, mode: str, repeat: int,
+             max_chunks: int, alloc_bytes: int) -> dict:
+    stream = b''.join(frames)
+    # Keep tiny chunk sizes affordable by replaying a whole-frame prefix only
+    limit = chunk * max_chunks
+    expect = len(frames)
+    if len(stream) > limit:
+        size, expect = _prefix(frames, limit)
+        if not expect:
+            return {'case': f'{name}/{chunk}/{mode}', 'stream': name, 'chunk': chunk,
+                    'mode': mode, 'skipped': 'first frame needs more than max_chunks reads'}
+        stream = stream[:size]
+    view = memoryview(stream)
+    # The allocation pass keeps frames alive, so bound it but cover one frame at least
+    alloc_size = max(_prefix(frames, alloc_bytes)[0], len(frames[0]))
+
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        got = _feed(view, chunk, mode)
+        dt = time.perf_counter() - t0
+        if got != expect:
+            raise RuntimeError(f'{name}/{chunk}/{mode}: parsed {got} frames, expected {expect}')
+        best = dt if best is None else min(best, dt)
+
+    return {
+        'case': f'{name}/{chunk}/{mode}',
+        'stream': name,
+        'chunk': chunk,
+        'mode': mode,
+        'bytes': len(stream),
+        'frames': expect,
+        'seconds': best,
+        'mb_per_s': len(stream) / best / 1e6,
+        'frames_per_s': expect / best,
+        'allocs_per_frame': _allocs_per_frame(view[:alloc_size], chunk, mode),
+    }
+
+
+def run_suite(streams=None, chunks=CHUNK_SIZES, modes=MODES, repeat: int = 3,
+              scale: float = 1.0, max_chunks: int = 1_000_000,
+              alloc_bytes: int = 8 * 1024 * 1024, progress=None) -> dict:
+    """Run every stream x chunk x mode case and return the JSON-ready report"""
+    results = []
+    for name in streams or STREAMS:
+        build, target = STREAMS[name]
+        frames = build(int(target * scale))
+        for chunk in chunks:
+            for mode in modes:
+                res = run_case(name, frames, chunk, mode, repeat, max_chunks, alloc_bytes)
+                results.append(res)
+                if progress is not None:
+                    progress(res)
+    try:
+        import numpy
+        np_version = numpy.__version__
+    except ImportError:
+        np_version = None
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+            'numpy': np_version,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'repeat': repeat,
+            'scale': scale,
+            'max_chunks': max_chunks,
+        },
+        'results': results,
+    }
+
+
+# ==============================
+# Baseline Comparison
+# ==============================
+def compare(report: dict, baseline: dict, tolerance: float = 0.10):
+    """Rows of (case, base MB/s, MB/s, ratio, base allocs, allocs, regressed)"""
+    base = {r['case']: r for r in baseline.get('results', ()) if 'skipped' not in r}
+    rows = []
+    for r in report['results']:
+        b = base.get(r['case'])
+        if b is None or 'skipped' in r:
+            continue
+        ratio = r['mb_per_s'] / b['mb_per_s'] if b['mb_per_s'] else float('inf')
+        # Allow half a block of noise from unrelated interpreter allocations
+        regressed = (ratio < 1.0 - tolerance
+                     or r['allocs_per_frame'] > b['allocs_per_frame'] + 0.5)
+        rows.append((r['case'], b['mb_per_s'], r['mb_per_s'], ratio,
+                     b['allocs_per_frame'], r['allocs_per_frame'], regressed))
+    return rows
+
+
+def _format_row(res: dict) -> str:
+    if 'skipped' in res:
+        return f"{res['case']:<28} skipped ({res['skipped']})"
+    return (f"{res['case']:<28} {res['bytes'] / 1e6:9.1f} MB {res['frames']:>9} frames "
+            f"{res['mb_per_s']:10.1f} MB/s {res['frames_per_s']:12.0f} frames/s "
+            f"{res['allocs_per_frame']:6.2f} allocs/frame")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='FrameParser throughput benchmark')
+    ap.add_argument('--stream', action='append', choices=tuple(STREAMS),
+                    help='stream to run (repeatable, default all)')
+    ap.add_argument('--chunk', action='append', type=int, help='chunk size in bytes (repeatable)')
+    ap.add_argument('--mode', action='append', choices=MODES, help='feed mode (repeatable)')
+    ap.add_argument('--repeat', type=int, default=3, help='runs per case, best is kept')
+    ap.add_argument('--scale', type=float, default=1.0, help='multiply stream sizes')
+    ap.add_argument('--max-chunks', type=int, default=1_000_000,
+                    help='cap on reads per case; longer streams are truncated')
+    ap.add_argument('--quick', action='store_true', help='small streams, one run per case')
+    ap.add_argument('--json', default=None, help='write the report to this file')
+    ap.add_argument('--baseline', default=None, help='compare against a stored report')
+    ap.add_argument('--tolerance', type=float, default=0.10,
+                    help='allowed MB/s drop against the baseline (fraction)')
+    args = ap.parse_args(argv)
+
+    repeat, scale, max_chunks = args.repeat, args.scale, args.max_chunks
+    if args.quick:
+        repeat, scale, max_chunks = 1, scale / 16, min(max_chunks, 100_000)
+
+    report = run_suite(args.stream, tuple(args.chunk or CHUNK_SIZES), tuple(args.mode or MODES),
+                       repeat=repeat, scale=scale, max_chunks=max_chunks,
+                       progress=lambda r: print(_format_row(r), flush=True))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'report written to {args.json}')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, args.tolerance)
+        print()
+        print(f"{'case':<28} {'base MB/s':>10} {'MB/s':>10} {'ratio':>7} {'allocs':>13}")
+        for case, b_mbs, mbs, ratio, b_al, al, bad in rows:
+            print(f'{case:<28} {b_mbs:10.1f} {mbs:10.1f} {ratio:7.2f} {b_al:6.2f}->{al:<6.2f}'
+                  f"{'  REGRESSION' if bad else ''}")
+        regressions = sum(1 for r in rows if r[-1])
+        print(f'{len(rows)} cases compared, {regressions} regressions')
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
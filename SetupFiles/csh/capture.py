@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+#
+# Raw receive stream capture
+# - Compact binary file: every received chunk with a monotonic ns timestamp and connection ID
+# - CaptureWriter: the receive thread only copies the chunk into a queue, a
+#   background thread writes it through a large buffered file
+# - CaptureReader: lazy, zero-copy iteration over an mmap of the file, and
+#   offline replay through RxBuffer/FrameParser
+#
+# Usage: python -m csh.capture FILE [--frames]
+
+import argparse
+import mmap
+import struct
+import threading
+import time
+from collections import deque, namedtuple
+
+from .protocol import FrameParser, RxBuffer, frame_cmd
+
+# File:   header, then records back to back
+# Header: magic, version, wall-clock time_ns and monotonic_ns when the file was opened
+# Record: monotonic_ns, connection id, kind, payload length, payload
+FILE_HEADER = struct.Struct('<6sHqq')
+RECORD_HEADER = struct.Struct('<qIBI')
+MAGIC = b'CSHCAP'
+VERSION = 1
+
+# Record kinds
+DATA, CONNECT, DISCONNECT, GAP = range(4)
+KIND_NAMES = ('data', 'connect', 'disconnect', 'gap')
+
+Record = namedtuple('Record', 't_ns conn_id kind data')
+
+
+# ==============================
+# Writer
+# ==============================
+class CaptureWriter:
+    """Appends records to a capture file from a background thread.
+
+    chunk()/event() may be called from any thread; they pack a small header,
+    copy the data and append to a deque, without locks or wakeups. The
+    writer thread drains the deque every flush_interval seconds. If more
+    than max_pending bytes are waiting, chunks are dropped and a GAP record
+    with the number of dropped bytes marks the hole.
+    """
+    def __init__(self, path: str, buffer_size: int = 4 * 1024 * 1024,
+                 flush_interval: float = 0.02, max_pending: int = 256 * 1024 * 1024):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._f = open(path, 'wb', buffering=buffer_size)
+        self._f.write(FILE_HEADER.pack(MAGIC, VERSION, time.time_ns(), time.monotonic_ns()))
+        self._q = deque()
+        # Each counter has a single writer thread, so no lock is needed
+        self.queued_bytes = 0      # receive side
+        self.written_bytes = 0     # writer thread
+        self.dropped_bytes = 0
+        self._gap = 0
+        self._stop_evt = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def chunk(self, conn_id: int, data, t_ns: int = None):
+        """Record received bytes (copied, so data may be a reused buffer view)"""
+        n = len(data)
+        if self.queued_bytes - self.written_bytes + n > self.max_pending:
+            self.dropped_bytes += n
+            self._gap += n
+            return
+        if t_ns is None:
+            t_ns = time.monotonic_ns()
+        if self._gap:
+            self._q.append((0, RECORD_HEADER.pack(t_ns, conn_id, GAP, 8), struct.pack('<q', self._gap)))
+            self._gap = 0
+        # Header and data stay separate items: concatenating would copy the chunk twice
+        self._q.append((n, RECORD_HEADER.pack(t_ns, conn_id, DATA, n), bytes(data)))
+        self.queued_bytes += n
+
+    def event(self, conn_id: int, kind: int, text: str = ''):
+        """Record a CONNECT/DISCONNECT marker with an optional description"""
+        data = text.encode('utf-8')
+        self._q.append((0, RECORD_HEADER.pack(time.monotonic_ns(), conn_id, kind, len(data)), data))
+
+    def connect(self, conn_id: int, text: str = ''):
+        self.event(conn_id, CONNECT, text)
+
+    def disconnect(self, conn_id: int, text: str = ''):
+        self.event(conn_id, DISCONNECT, text)
+
+    def close(self):
+        """Write everything still queued and close the file"""
+        self._stop_evt.set()
+        self._thread.join()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _drain(self):
+        q, f = self._q, self._f
+        while q:
+            n, header, data = q.popleft()
+            f.write(header)
+            f.write(data)
+            self.written_bytes += n
+
+    def _run(self):
+        while not self._stop_evt.wait(self.flush_interval):
+            self._drain()
+        self._drain()
+        self._f.flush()
+
+
+# ==============================
+# Reader
+# ==============================
+class CaptureReader:
+    """Iterates a capture file lazily through mmap.
+
+    Record.data is a memoryview into the mapping: release the reader only
+    after the views are no longer needed (or copy them with bytes()).
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f'{path}: empty capture file')
+        self._view = memoryview(self._mm)
+        try:
+            if len(self._mm) < FILE_HEADER.size:
+                raise ValueError(f'{path}: truncated capture header')
+            magic, version, self.wall_ns, self.mono_ns = FILE_HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC:
+                raise ValueError(f'{path}: not a capture file')
+            if version != VERSION:
+                raise ValueError(f'{path}: unsupported capture version {version}')
+        except ValueError:
+            self.close()
+            raise
+        self.version = version
+
+    def close(self):
+        self._view.release()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        """Records in file order; a record cut short by a crash ends the iteration"""
+        mm, view = self._mm, self._view
+        size = len(mm)
+        off = FILE_HEADER.size
+        unpack = RECORD_HEADER.unpack_from
+        hdr = RECORD_HEADER.size
+        while off + hdr <= size:
+            t_ns, conn_id, kind, n = unpack(mm, off)
+            off += hdr
+            if off + n > size:
+                return
+            yield Record(t_ns, conn_id, kind, view[off:off + n])
+            off += n
+
+    def frames(self, views: bool = False):
+        """Replay DATA records through one RxBuffer/FrameParser per connection.
+
+        Yields (t_ns, conn_id, frame) with t_ns of the chunk that completed
+        the frame; a new connection or a GAP restarts that connection's parser.
+        """
+        state = {}
+        for t_ns, conn_id, kind, data in self:
+            if kind != DATA:
+                state.pop(conn_id, None)
+                continue
+            st = state.get(conn_id)
+            if st is None:
+                st = state[conn_id] = (RxBuffer(), FrameParser(views=views))
+            ring, parser = st
+            ring.extend(data)
+            while True:
+                frame = parser.try_extract(ring)
+                if frame is None:
+                    break
+                yield t_ns, conn_id, frame
+
+    def summary(self) -> dict:
+        counts = [0] * len(KIND_NAMES)
+        data_bytes = 0
+        conns = set()
+        first = last = None
+        for t_ns, conn_id, kind, data in self:
+            if kind < len(counts):
+                counts[kind] += 1
+            if kind == DATA:
+                data_bytes += len(data)
+            conns.add(conn_id)
+            first = t_ns if first is None else first
+            last = t_ns
+        out = {name: counts[k] for k, name in enumerate(KIND_NAMES)}
+        out.update({'connections': len(conns), 'data_bytes': data_bytes,
+                    'duration_s': (last - first) / 1e9 if first is not None else 0.0})
+        return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Summarise a CSH capture file')
+    ap.add_argument('path')
+    ap.add_argument('--frames', action='store_true', help='replay through the parser and count frames')
+    args = ap.parse_args(argv)
+
+    with CaptureReader(args.path) as rd:
+        st = rd.summary()
+        print(f"{args.path}: {st['data']} chunks, {st['data_bytes']} bytes, "
+              f"{st['connections']} connections, {st['duration_s']:.3f}s, "
+              f"{st['gap']} gaps, {st['connect']} connects, {st['disconnect']} disconnects")
+        if args.frames:
+            per_cmd = {}
+            for _, _, frame in rd.frames():
+                cmd = frame_cmd(frame) or 'text'
+                per_cmd[cmd] = per_cmd.get(cmd, 0) + 1
+            for cmd, n in sorted(per_cmd.items()):
+                print(f'  {cmd:<5} {n}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+#
+# Pipelined R_C continuous-inspection driver
+# - Keeps up to `window` R_C requests in flight on one ReconnectingClient
+# - Optional pacing to a target request rate
+# - Reports achieved results/sec and bytes/sec
+#
+# Usage: python -m csh.continuous HOST PORT FRAMES [--window N] [--rate HZ] [--seconds S]
+
+import argparse
+import threading
+import time
+
+from .protocol import FrameParser
+
+
+# ==============================
+# Continuous Driver
+# ==============================
+class ContinuousDriver:
+    """Drive back-to-back R_C inspections through client.request().
+
+    Responses are matched in order by the client, so the driver only has to
+    bound the number of outstanding requests and account for completions.
+    """
+    RETRY_WAIT = 0.1   # pause while the client is disconnected or rejects sends
+
+    def __init__(self, client, frame_count: int, window: int = 4, rate: float = None,
+                 timeout: float = 10.0, cmd: str = 'R_C'):
+        self.client = client
+        self.frame_count = int(frame_count)
+        self.window = max(1, int(window))
+        self.rate = rate
+        self.timeout = timeout
+        self.cmd = cmd
+        # Wire size of one A_R response: A_R@<n>@<payload>@\r\n
+        self.frame_bytes = (len(f'A_R@{self.frame_count}@') + 3
+                            + FrameParser.payload_len('A_R', self.frame_count))
+
+        self._slots = threading.Semaphore(self.window)
+        self._lock = threading.Lock()
+        self._stop_evt = threading.Event()
+        self._thread = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.sent = 0
+            self.results = 0
+            self.errors = 0
+            self.bytes = 0
+            self.latency_sum = 0.0
+            self.latency_max = 0.0
+            self.t_start = time.perf_counter()
+            self.t_last = self.t_start
+
+    # --- Control ---
+    def start(self, total: int = None, duration: float = None):
+        """Start sending in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_evt.clear()
+        self.reset_stats()
+        self._thread = threading.Thread(target=self._runner, args=(total, duration), daemon=True)
+        self._thread.start()
+
+    def stop(self, drain: bool = True):
+        """Stop sending; with drain, wait for in-flight requests to finish"""
+        self._stop_evt.set()
+        if self._thread:
+            self._thread.join()
+        if drain:
+            for _ in range(self.window):
+                self._slots.acquire(timeout=self.timeout)
+            for _ in range(self.window):
+                self._slots.release()
+
+    def wait(self):
+        """Block until a bounded run (total/duration) has finished"""
+        if self._thread:
+            self._thread.join()
+        self.stop()
+
+    @property
+    def in_flight(self) -> int:
+        return self.sent - self.results - self.errors
+
+    def stats(self) -> dict:
+        with self._lock:
+            elapsed = max(1e-9, self.t_last - self.t_start)
+            done = self.results
+            return {
+                'frame_count': self.frame_count,
+                'window': self.window,
+                'sent': self.sent,
+                'results': done,
+                'errors': self.errors,
+                'in_flight': self.in_flight,
+                'bytes': self.bytes,
+                'elapsed_s': elapsed,
+                'results_per_s': done / elapsed,
+                'bytes_per_s': self.bytes / elapsed,
+                'latency_avg_s': self.latency_sum / done if done else 0.0,
+                'latency_max_s': self.latency_max,
+            }
+
+    # --- Main loop ---
+    def _runner(self, total, duration):
+        interval = 1.0 / self.rate if self.rate else 0.0
+        t_end = time.perf_counter() + duration if duration else None
+        next_send = time.perf_counter()
+        while not self._stop_evt.is_set():
+            if total is not None and self.sent >= total:
+                break
+            now = time.perf_counter()
+            if t_end is not None and now >= t_end:
+                break
+            if interval:
+                if now < next_send:
+                    self._stop_evt.wait(next_send - now)
+                    continue
+                # Do not burst to catch up after a stall
+                next_send = max(next_send + interval, now)
+            if not self.client.is_connected:
+                self._stop_evt.wait(self.RETRY_WAIT)
+                continue
+            if not self._slots.acquire(timeout=0.1):
+                continue
+            t_sent = time.perf_counter()
+            fut = self.client.request(self.cmd, self.frame_count, timeout=self.timeout)
+            if fut.done() and not fut.cancelled() and isinstance(fut.exception(), ConnectionError):
+                # Rejected before it was written (disconnected, queue full): not an attempt
+                self._slots.release()
+                self._stop_evt.wait(self.RETRY_WAIT)
+                continue
+            with self._lock:
+                self.sent += 1
+            fut.add_done_callback(lambda f, t=t_sent: self._on_done(f, t))
+
+    def _on_done(self, fut, t_sent: float):
+        now = time.perf_counter()
+        with self._lock:
+            if fut.cancelled() or fut.exception() is not None or fut.result() is None:
+                self.errors += 1
+            else:
+                lat = now - t_sent
+                self.results += 1
+                self.bytes += self.frame_bytes
+                self.latency_sum += lat
+                self.latency_max = max(self.latency_max, lat)
+            self.t_last = now
+        self._slots.release()
+
+
+def main(argv=None):
+    from .transport import ReconnectingClient
+
+    ap = argparse.ArgumentParser(description='Continuous R_C throughput driver')
+    ap.add_argument('host')
+    ap.add_argument('port', type=int)
+    ap.add_argument('frames', type=int, help='frame count per R_C')
+    ap.add_argument('--window', type=int, default=4, help='requests kept in flight')
+    ap.add_argument('--rate', type=float, default=None, help='target requests/sec')
+    ap.add_argument('--seconds', type=float, default=10.0)
+    args = ap.parse_args(argv)
+
+    client = ReconnectingClient(lambda s: None, lambda f: None)
+    client.start(args.host, args.port)
+    t0 = time.monotonic()
+    while not client.is_connected:
+        if time.monotonic() - t0 > 10.0:
+            raise SystemExit(f'cannot connect to {args.host}:{args.port}')
+        time.sleep(0.05)
+
+    drv = ContinuousDriver(client, args.frames, window=args.window, rate=args.rate)
+    drv.start(duration=args.seconds)
+    drv.wait()
+    client.close()
+    st = drv.stats()
+    print(f"{st['results']} results in {st['elapsed_s']:.2f}s: "
+          f"{st['results_per_s']:.1f} results/s, {st['bytes_per_s'] / 1e6:.2f} MB/s, "
+          f"avg latency {st['latency_avg_s'] * 1e3:.2f} ms, errors {st['errors']}")
+
+
+if __name__ == '__main__':
+    main()
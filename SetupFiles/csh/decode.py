@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+#
+# Decoding of complete CSH frames into typed result objects
+# - A_R -> ResultData, A_D -> ShiftData, A_M -> MarkData, other -> TextLine
+# - NumPy is optional; without it payloads decode to memoryview('d') slices
+
+import math
+import struct
+import sys
+from array import array
+from dataclasses import dataclass
+
+from .protocol import FrameParser
+
+# numpy is imported on first use so that `import csh` stays cheap
+np = None
+_np_tried = False
+
+
+def _numpy():
+    """numpy module, or None for the pure-stdlib fallback in decode_*()"""
+    global np, _np_tried
+    if not _np_tried:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np, _np_tried = numpy, True
+    return np
+
+
+# ==============================
+# Payload Decoding
+# ==============================
+# A_R payload header: sTime(i64) frameCount(i32) fps ledLeft ledRight testTime
+A_R_HEADER = struct.Struct('<qi4d')
+AXIS_NAMES = ('X', 'Y', 'Z', 'TX', 'TY', 'TZ')
+
+
+def _f64_view(buf, offset: int, count: int):
+    """Little-endian doubles at buf[offset:] without copying when possible"""
+    if _numpy() is not None:
+        return np.frombuffer(buf, dtype='<f8', count=count, offset=offset)
+    mv = memoryview(buf)[offset:offset + count * 8]
+    if sys.byteorder == 'little':
+        return mv.cast('d')
+    arr = array('d', mv)
+    arr.byteswap()
+    return memoryview(arr)
+
+
+@dataclass
+class ResultData:
+    """Decoded A_R payload (sSaveResultBin on the server side).
+
+    axes holds the six per-frame columns X/Y/Z/TX/TY/TZ. With NumPy it is a
+    (6, frame_count) float64 view onto the received frame; otherwise it is
+    a list of six memoryview('d') slices. Either way no per-double Python
+    objects are created until a consumer indexes into it.
+    """
+    s_time: int
+    frame_count: int
+    fps: float
+    led_left: float
+    led_right: float
+    test_time: float
+    axes: object
+
+    @property
+    def X(self): return self.axes[0]
+    @property
+    def Y(self): return self.axes[1]
+    @property
+    def Z(self): return self.axes[2]
+    @property
+    def TX(self): return self.axes[3]
+    @property
+    def TY(self): return self.axes[4]
+    @property
+    def TZ(self): return self.axes[5]
+
+    def __len__(self):
+        return len(self.axes[0])
+
+    def axis_stats(self):
+        """(min, max, mean) per axis, computed without per-row Python loops"""
+        n = len(self)
+        if n == 0:
+            return [(math.nan, math.nan, math.nan)] * 6
+        if _numpy() is not None:
+            a = self.axes
+            return list(zip(a.min(axis=1).tolist(), a.max(axis=1).tolist(), a.mean(axis=1).tolist()))
+        return [(min(a), max(a), math.fsum(a) / n) for a in self.axes]
+
+    def copy(self):
+        """Result that owns its data (detached from the receive buffer)"""
+        if _numpy() is not None:
+            axes = self.axes.copy()
+        else:
+            axes = [memoryview(bytes(a)).cast('d') for a in self.axes]
+        return ResultData(self.s_time, self.frame_count, self.fps, self.led_left,
+                          self.led_right, self.test_time, axes)
+
+    def rows(self, first: int, count: int):
+        """Per-frame tuples (X, Y, Z, TX, TY, TZ) for frames [first, first+count)"""
+        last = min(len(self), first + count)
+        if _numpy() is not None:
+            return self.axes[:, first:last].T.tolist()
+        return list(zip(*(a[first:last].tolist() for a in self.axes)))
+
+
+def decode_a_r(payload, frm_cnt: int):
+    """Decode an A_R payload (bytes/memoryview); None if it is too short"""
+    if frm_cnt < 0 or len(payload) < A_R_HEADER.size + frm_cnt * FrameParser.A_R_FRAME_BYTES:
+        return None
+    s_time, frame_ct, fps, led_l, led_r, test_t = A_R_HEADER.unpack_from(payload, 0)
+    flat = _f64_view(payload, A_R_HEADER.size, frm_cnt * 6)
+    if _numpy() is not None:
+        axes = flat.reshape(6, frm_cnt)
+    else:
+        axes = [flat[i * frm_cnt:(i + 1) * frm_cnt] for i in range(6)]
+    return ResultData(s_time, frame_ct, fps, led_l, led_r, test_t, axes)
+
+
+def decode_a_d(payload):
+    """Decode an A_D payload into a view of little-endian doubles"""
+    return _f64_view(payload, 0, len(payload) // 8)
+
+
+# ==============================
+# Frame Decoding
+# ==============================
+@dataclass
+class ShiftData:
+    """Decoded A_D frame: announced count and the shift values"""
+    count: int
+    values: object
+
+
+@dataclass
+class MarkData:
+    """Decoded A_M frame"""
+    mark_id: str
+
+
+@dataclass
+class TextLine:
+    """Any other frame: one ASCII line without its CRLF"""
+    text: str
+
+
+def decode_frame(frame):
+    """Decode one complete frame (bytes or memoryview); None if it is malformed.
+
+    A_R/A_D payloads are decoded as views onto the frame, so the result is
+    only valid as long as the frame's memory is. Use ResultData.copy() to
+    keep a result decoded from a zero-copy receive buffer.
+    """
+    mv = memoryview(frame)
+    head = bytes(mv[:32])
+    first_at = head.find(b'@')
+    cmd = head[:first_at] if first_at > 0 else b''
+
+    if cmd in (b'A_D', b'A_R'):
+        second_at = head.find(b'@', first_at + 1)
+        if second_at < 0 or bytes(mv[-3:]) != b'@\r\n':
+            return None
+        try:
+            count = int(head[first_at + 1:second_at].decode('ascii'))
+        except ValueError:
+            return None
+        payload = mv[second_at + 1:len(mv) - 3]
+        if cmd == b'A_D':
+            return ShiftData(count, decode_a_d(payload))
+        return decode_a_r(payload, count)
+
+    # ASCII frames are short; work on a bytes copy
+    data = bytes(mv)
+    crlf = data.find(b'\r\n')
+    if cmd == b'A_M':
+        second_at = data.find(b'@', first_at + 1)
+        if second_at < 0:
+            return None
+        return MarkData(data[first_at + 1:second_at].decode('ascii', errors='ignore'))
+    if crlf >= 0:
+        return TextLine(data[:crlf].decode('ascii', errors='ignore'))
+    return None
@@ -0,0 +1,463 @@
+# -*- coding: utf-8 -*-
+#
+# asyncio emulator of the C# CSHServer (Form1.Network_FrameReceived)
+# - Same command set: P_S, R_S/R_C -> A_R, D_S -> A_D, M_S -> A_M, B_U, P_L, S_L, C_L, D_L, A_P
+# - Byte-identical framing (MakeSaveResult / MakeMarkShift payloads)
+# - Serves many concurrent clients over TCP or a Unix socket (no SingleClientMode)
+# - Optional per-connection network impairment (latency, jitter, bandwidth, fragmentation, disconnects)
+#
+# Usage: python -m csh.emulator [--host H] [--port P] [--unix PATH] [--verbose]
+#        [--latency-ms MS] [--jitter-ms MS] [--bandwidth-kbps KB] [--segment N] [--disconnect-prob P] [--seed S]
+
+import argparse
+import asyncio
+import math
+import random
+import socket
+import struct
+import sys
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from .decode import A_R_HEADER
+from .protocol import FrameParser, RxBuffer
+
+# writelines() only scatters from 3.12 on; before that it joins its arguments
+_SCATTER_WRITELINES = sys.version_info >= (3, 12)
+
+try:
+    import numpy as np
+except ImportError:  # struct fallback in make_result_body()
+    np = None
+
+
+# ==============================
+# Payload Builders
+# ==============================
+UM_SCALE = 5.5 / 0.30
+MIN_SCALE = 180 / math.pi * 60
+# MakeSaveResult columns are (k * i) * scale, evaluated in that order for
+# bit-identical doubles: X/Y/Z use umscale, TX/TY/TZ use minscale
+AXIS_COEFS = ((1, UM_SCALE), (2, UM_SCALE), (3, UM_SCALE),
+              (0.1, MIN_SCALE), (0.2, MIN_SCALE), (0.3, MIN_SCALE))
+
+
+def make_result_body(frm_cnt: int) -> bytes:
+    """The six X/Y/Z/TX/TY/TZ columns of an A_R payload (no header)"""
+    if np is not None:
+        i = np.arange(frm_cnt, dtype=np.int64)
+        cols = np.empty((6, frm_cnt), dtype='<f8')
+        for row, (k, scale) in enumerate(AXIS_COEFS):
+            np.multiply(k * i, scale, out=cols[row])
+        return cols.tobytes()
+    col = struct.Struct(f'<{frm_cnt}d')
+    return b''.join(col.pack(*[(k * i) * scale for i in range(frm_cnt)]) for k, scale in AXIS_COEFS)
+
+
+def make_result_header(frm_cnt: int, s_time: int = None) -> bytes:
+    """44-byte A_R payload header (sTime, frameCount, fps, LEDs, testTime)"""
+    if s_time is None:
+        s_time = int(time.time())
+    return A_R_HEADER.pack(s_time, frm_cnt, 1000.0, 2.7, 2.7, 10.0)
+
+
+def make_save_result(frm_cnt: int, s_time: int = None) -> bytes:
+    """A_R payload built like Form1.MakeSaveResult (without the CSV dump)"""
+    return make_result_header(frm_cnt, s_time) + make_result_body(frm_cnt)
+
+
+class PayloadCache:
+    """LRU of A_R payload bodies per frame count, bounded by total bytes.
+
+    Apart from sTime the payload is a pure function of the frame count, so
+    the columns are built once and only the 44-byte header is packed per
+    response. Bodies larger than the whole budget are built but not kept.
+    """
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lru = OrderedDict()
+
+    def body(self, frm_cnt: int) -> bytes:
+        body = self._lru.get(frm_cnt)
+        if body is not None:
+            self.hits += 1
+            self._lru.move_to_end(frm_cnt)
+            return body
+        self.misses += 1
+        body = make_result_body(frm_cnt)
+        if len(body) <= self.max_bytes:
+            self._lru[frm_cnt] = body
+            self.bytes += len(body)
+            while self.bytes > self.max_bytes:
+                _, old = self._lru.popitem(last=False)
+                self.bytes -= len(old)
+                self.evictions += 1
+        return body
+
+    def payload(self, frm_cnt: int, s_time: int = None):
+        """(header, body) of an A_R payload; body is shared, never modify it"""
+        return make_result_header(frm_cnt, s_time), self.body(frm_cnt)
+
+    def stats(self) -> dict:
+        return {'entries': len(self._lru), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+def make_mark_shift() -> bytes:
+    """A_D payload of Form1.MakeMarkShift"""
+    return struct.pack('<6d', 1.1, 2.2, 3.3, 4.4, 5.5, 6.6)
+
+
+_TAIL = b'@\r\n'
+_MARK_SHIFT = make_mark_shift()
+
+_LOAD_MSG = {
+    'P_L': ('Pogo Pin Unload', 'Pogo Pin load'),
+    'S_L': ('Side Push Unload', 'Side Push load'),
+    'C_L': ('Cam Side Push Unload', 'Cam Side Push load'),
+    'D_L': ('All Dln Unload', 'All Dln load'),
+}
+
+
+def _try_int(s: str):
+    try:
+        return int(s)
+    except ValueError:
+        return None
+
+
+# ==============================
+# Network Impairment
+# ==============================
+@dataclass
+class Impairment:
+    """Per-connection impairment applied to everything the emulator sends.
+
+    latency_s + a jitter sample (uniform in [0, jitter_s], normal with
+    sigma jitter_s, or exponential with mean jitter_s) delays each response;
+    delays never reorder responses. bandwidth_bps caps throughput with a
+    token bucket of burst_bytes. segment_size splits writes into pieces
+    as small as 1 byte. disconnect_prob is the chance that a response is
+    cut off at a random byte and the connection aborted. seed makes all of
+    it reproducible (connection n uses seed + n).
+    """
+    latency_s: float = 0.0
+    jitter_s: float = 0.0
+    jitter_dist: str = 'uniform'
+    bandwidth_bps: float = None
+    burst_bytes: int = 64 * 1024
+    segment_size: int = None
+    disconnect_prob: float = 0.0
+    seed: int = None
+
+    def delay(self, rng: random.Random) -> float:
+        j = self.jitter_s
+        if j <= 0:
+            return self.latency_s
+        if self.jitter_dist == 'normal':
+            return max(0.0, self.latency_s + rng.gauss(0.0, j))
+        if self.jitter_dist == 'exponential':
+            return self.latency_s + rng.expovariate(1.0 / j)
+        return self.latency_s + rng.uniform(0.0, j)
+
+
+class _ImpairedLink:
+    """Sends a connection's responses through an Impairment, in order"""
+    PACE_CHUNK = 16 * 1024
+
+    def __init__(self, writer, imp: Impairment, rng: random.Random):
+        self._writer = writer
+        self._imp = imp
+        self._rng = rng
+        self._queue = asyncio.Queue()
+        self._last_due = 0.0
+        self._tokens = float(imp.burst_bytes)
+        self._t_fill = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def send(self, parts):
+        # All random draws happen here, per response in request order, so a
+        # seed gives the same delays and cut points however requests arrive
+        imp, rng = self._imp, self._rng
+        due = max(self._last_due, time.monotonic() + imp.delay(rng))
+        self._last_due = due
+        cut = None
+        if imp.disconnect_prob and rng.random() < imp.disconnect_prob:
+            cut = rng.randrange(sum(len(p) for p in parts) or 1)
+        self._queue.put_nowait((due, parts, cut))
+
+    def close(self):
+        self._task.cancel()
+
+    def _chunks(self, parts):
+        """Memoryview pieces of the frame, without joining the parts"""
+        step = self._imp.segment_size or (self.PACE_CHUNK if self._imp.bandwidth_bps else 0)
+        for part in parts:
+            mv = memoryview(part)
+            if not step:
+                yield mv
+                continue
+            for off in range(0, len(mv), step):
+                yield mv[off:off + step]
+
+    async def _take_tokens(self, n: int):
+        rate = self._imp.bandwidth_bps
+        now = time.monotonic()
+        self._tokens = min(float(self._imp.burst_bytes), self._tokens + (now - self._t_fill) * rate)
+        self._t_fill = now
+        self._tokens -= n
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / rate)
+
+    async def _run(self):
+        imp, w = self._imp, self._writer
+        while True:
+            due, parts, cut = await self._queue.get()
+            wait = due - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            sent = 0
+            for chunk in self._chunks(parts):
+                if cut is not None and sent + len(chunk) > cut:
+                    w.write(chunk[:cut - sent])
+                    await w.drain()
+                    w.transport.abort()
+                    return
+                if imp.bandwidth_bps:
+                    await self._take_tokens(len(chunk))
+                w.write(chunk)
+                sent += len(chunk)
+                if imp.segment_size:
+                    # Flush each segment on its own so the peer sees it separately
+                    await w.drain()
+            await w.drain()
+
+
+# ==============================
+# Emulator Server
+# ==============================
+class EmulatorServer:
+    """Python stand-in for the WinForms CSHServer.
+
+    Responses go to the client that sent the request. Set broadcast=True
+    to send them to every connected client, like Network.SendData does.
+
+    impairment is an Impairment applied to every connection, or a callable
+    (conn_index, peername) -> Impairment/None for per-connection settings.
+    """
+    def __init__(self, host: str = '127.0.0.1', port: int = 5000, unix_path: str = None,
+                 log_cb=None, broadcast: bool = False, cache_bytes: int = 256 * 1024 * 1024,
+                 impairment=None):
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.broadcast = broadcast
+        self.run_num = 1
+        self.cache = PayloadCache(cache_bytes)
+        self.impairment = impairment
+        self._conn_count = 0
+        self._links = {}
+        self._log_cb = log_cb
+        self._server = None
+        self._writers = set()
+        self._tasks = set()
+
+    # --- Control ---
+    async def start(self):
+        if self.unix_path:
+            self._server = await asyncio.start_unix_server(self._handle_client, self.unix_path)
+        else:
+            self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+            # Port 0 picks a free port; report the real one
+            self.port = self._server.sockets[0].getsockname()[1]
+        self._log(f'Server Listen Start (Port: {self.unix_path or self.port})')
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            for w in list(self._writers):
+                w.close()
+            # Let the client handlers see EOF and finish
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    @property
+    def client_count(self) -> int:
+        return len(self._writers)
+
+    # --- Internals ---
+    def _log(self, s: str):
+        if self._log_cb is not None:
+            self._log_cb(s)
+
+    def _send(self, writer, *parts: bytes):
+        """Write a frame as separate parts (head, payload, tail).
+
+        A cached A_R body is shared by every client it goes to instead of
+        being copied into a per-response buffer. On CPython 3.12+
+        writelines() sends the parts with a single sendmsg; older versions
+        join them, so there each part gets its own write(), which sends
+        straight from the part while the transport buffer is empty and
+        copies only what the socket does not take.
+        """
+        for w in (self._writers if self.broadcast else (writer,)):
+            if w.is_closing():
+                continue
+            link = self._links.get(w)
+            if link is not None:
+                link.send(parts)
+            elif _SCATTER_WRITELINES:
+                w.writelines(parts)
+            else:
+                for part in parts:
+                    w.write(part)
+
+    def _make_link(self, writer, peer):
+        imp = self.impairment
+        if callable(imp):
+            imp = imp(self._conn_count, peer)
+        if imp is None:
+            return None
+        seed = None if imp.seed is None else imp.seed + self._conn_count
+        return _ImpairedLink(writer, imp, random.Random(seed))
+
+    async def _handle_client(self, reader, writer):
+        sock = writer.get_extra_info('socket')
+        if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        peer = writer.get_extra_info('peername')
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        self._writers.add(writer)
+        link = self._make_link(writer, peer)
+        self._conn_count += 1
+        if link is not None:
+            self._links[writer] = link
+        self._log(f'[ACCEPT] {peer}')
+        ring = RxBuffer()
+        parser = FrameParser()
+        try:
+            while True:
+                data = await reader.read(64 * 1024)
+                if not data:
+                    break
+                ring.extend(data)
+                while True:
+                    frame = parser.try_extract(ring)
+                    if frame is None:
+                        break
+                    await self._on_frame(writer, frame)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError) as ex:
+            self._log(f'[RX] Exception: {ex}')
+        finally:
+            self._tasks.discard(task)
+            self._writers.discard(writer)
+            if link is not None:
+                self._links.pop(writer, None)
+                link.close()
+            writer.close()
+            self._log(f'[DISCONNECT] {peer}')
+
+    async def _on_frame(self, writer, frame: bytes):
+        """Form1.Network_FrameReceived"""
+        text = frame.decode('ascii', errors='replace').rstrip('\r\n')
+        if not text.strip():
+            return
+        arry = text.split('@')
+        cmd = arry[0]
+
+        if cmd == 'P_S':
+            self._log('P_S Recieve')
+
+        elif cmd in ('R_S', 'R_C'):
+            if len(arry) < 2:
+                self._log(f'[WARN] {cmd} missing arg')
+                return
+            frm_cnt = _try_int(arry[1])
+            if frm_cnt is None or frm_cnt < 0:
+                self._log(f'[WARN] {cmd} arg parse fail')
+                return
+            if cmd == 'R_C':
+                await asyncio.sleep(0.001)   # Thread.Sleep(1)
+            self._log(f'[{self.run_num}] - {cmd} Recieve, trg :{frm_cnt}')
+            self.run_num += 1
+            header, body = self.cache.payload(frm_cnt)
+            self._send(writer, f'A_R@{frm_cnt}@'.encode('ascii') + header, body, _TAIL)
+
+        elif cmd == 'D_S':
+            self._log('D_S Recieve==')
+            self._log('A_D Send')
+            self._send(writer, b'A_D@6@', _MARK_SHIFT, _TAIL)
+
+        elif cmd == 'M_S':
+            self.run_num = 0
+            self._log('Mark ID : 3 Send')
+            self._send(writer, b'A_M@3@\r\n')
+
+        elif cmd == 'B_U':
+            val = _try_int(arry[1]) if len(arry) >= 2 else None
+            if val is not None:
+                self._log('Base Down' if val == 0 else 'Base Up')
+
+        elif cmd in _LOAD_MSG:
+            val = _try_int(arry[1]) if len(arry) >= 2 else None
+            if val is not None:
+                self._log(_LOAD_MSG[cmd][0 if val == 0 else 1])
+
+        elif cmd == 'A_P':
+            self._log('A_P Recieve,')
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='CSH server emulator')
+    ap.add_argument('--host', default='0.0.0.0')
+    ap.add_argument('--port', type=int, default=5000)
+    ap.add_argument('--unix', default=None, help='listen on a Unix socket path instead of TCP')
+    ap.add_argument('--verbose', action='store_true', help='print the server log')
+    ap.add_argument('--cache-mb', type=int, default=256, help='A_R payload cache budget')
+    imp = ap.add_argument_group('network impairment')
+    imp.add_argument('--latency-ms', type=float, default=0.0)
+    imp.add_argument('--jitter-ms', type=float, default=0.0)
+    imp.add_argument('--jitter-dist', choices=('uniform', 'normal', 'exponential'), default='uniform')
+    imp.add_argument('--bandwidth-kbps', type=float, default=None, help='cap in kilobytes/sec')
+    imp.add_argument('--segment', type=int, default=None, help='max bytes per write (down to 1)')
+    imp.add_argument('--disconnect-prob', type=float, default=0.0, help='chance per response of a cut-off disconnect')
+    imp.add_argument('--seed', type=int, default=None)
+    args = ap.parse_args(argv)
+
+    impairment = None
+    if (args.latency_ms or args.jitter_ms or args.bandwidth_kbps or args.segment
+            or args.disconnect_prob):
+        impairment = Impairment(
+            latency_s=args.latency_ms / 1000.0, jitter_s=args.jitter_ms / 1000.0,
+            jitter_dist=args.jitter_dist,
+            bandwidth_bps=args.bandwidth_kbps * 1024 if args.bandwidth_kbps else None,
+            segment_size=args.segment, disconnect_prob=args.disconnect_prob, seed=args.seed)
+
+    def log(s):
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S')}, {s}")
+
+    srv = EmulatorServer(args.host, args.port, args.unix, log_cb=log if args.verbose else None,
+                         cache_bytes=args.cache_mb * 1024 * 1024, impairment=impairment)
+    try:
+        asyncio.run(srv.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+#
+# Metrics registry
+# - Counters, gauges and log-linear (HDR-style) histograms, labelled per station/cmd
+# - Hot-path updates are plain attribute increments, no locks
+# - Callback metrics read existing stats at snapshot time and cost nothing in between
+# - snapshot() dict, Prometheus text format, and a local HTTP endpoint (/metrics, /metrics.json)
+
+import json
+import threading
+
+
+def _label_str(labels: tuple) -> str:
+    if not labels:
+        return ''
+    body = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                    for k, v in labels)
+    return '{' + body + '}'
+
+
+# ==============================
+# Metric Types
+# ==============================
+class Counter:
+    """Monotonic count; inc() from one writer thread, or fn() read on demand"""
+    kind = 'counter'
+
+    def __init__(self, fn=None):
+        self.value = 0
+        self._fn = fn
+
+    def inc(self, n: int = 1):
+        self.value += n
+
+    def get(self):
+        return self._fn() if self._fn is not None else self.value
+
+
+class Gauge(Counter):
+    """Value that goes up and down; set()/inc()/dec(), or fn() read on demand"""
+    kind = 'gauge'
+
+    def set(self, v):
+        self.value = v
+
+    def dec(self, n: int = 1):
+        self.value -= n
+
+
+class Histogram:
+    """Log-linear histogram of non-negative integers (e.g. nanoseconds).
+
+    Like HdrHistogram: values below 2 * SUB_BUCKETS are counted exactly,
+    above that every power of two is split into SUB_BUCKETS linear buckets,
+    so quantiles are within 1/SUB_BUCKETS (~3%) of the true value. record()
+    is an index computation and a list increment.
+    """
+    kind = 'histogram'
+    SUB_BITS = 5
+    SUB_BUCKETS = 1 << SUB_BITS
+
+    def __init__(self, scale: float = 1.0):
+        self.scale = scale          # multiplier applied on export (e.g. 1e-9 for ns -> s)
+        self.counts = [0] * (64 * self.SUB_BUCKETS)
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, v: int):
+        v = int(v)
+        if v < 0:
+            v = 0
+        shift = v.bit_length() - self.SUB_BITS - 1
+        if shift <= 0:
+            idx = v
+        else:
+            idx = shift * self.SUB_BUCKETS + (v >> shift)
+        self.counts[idx] += 1
+        self.count += 1
+        self.sum += v
+        if v > self.max:
+            self.max = v
+        if self.min is None or v < self.min:
+            self.min = v
+
+    @classmethod
+    def _bucket_bounds(cls, idx: int):
+        if idx < 2 * cls.SUB_BUCKETS:
+            return idx, idx
+        shift = idx // cls.SUB_BUCKETS - 1
+        m = idx - shift * cls.SUB_BUCKETS
+        return m << shift, ((m + 1) << shift) - 1
+
+    def quantile(self, q: float):
+        """Value at quantile q (bucket upper bound, capped at the max seen)"""
+        if not self.count:
+            return 0
+        rank = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for idx, c in enumerate(self.counts):
+            if c:
+                seen += c
+                if seen >= rank:
+                    return min(self._bucket_bounds(idx)[1], self.max)
+        return self.max
+
+    QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+    def get(self) -> dict:
+        s = self.scale
+        out = {'count': self.count, 'sum': self.sum * s,
+               'min': (self.min or 0) * s, 'max': self.max * s}
+        for q in self.QUANTILES:
+            out[f'p{q * 100:g}'] = self.quantile(q) * s
+        return out
+
+    def reset(self):
+        self.counts = [0] * len(self.counts)
+        self.count = self.sum = self.max = 0
+        self.min = None
+
+
+# ==============================
+# Registry
+# ==============================
+class Registry:
+    """Named, labelled metrics; asking twice for the same name+labels returns the same metric"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}   # (name, labels) -> metric
+        self._help = {}
+        self._kind = {}
+
+    def _get(self, cls, name: str, help: str, labels: dict, *args, **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        m = self._metrics.get(key)
+        if m is not None:
+            return m
+        with self._lock:
+            m = self._metrics.get(key)
+            if m is None:
+                kind = self._kind.setdefault(name, cls.kind)
+                if kind != cls.kind:
+                    raise ValueError(f'{name} is already registered as a {kind}')
+                if help:
+                    self._help.setdefault(name, help)
+                m = self._metrics[key] = cls(*args, **kwargs)
+        return m
+
+    def counter(self, name: str, help: str = '', fn=None, **labels) -> Counter:
+        return self._get(Counter, name, help, labels, fn)
+
+    def gauge(self, name: str, help: str = '', fn=None, **labels) -> Gauge:
+        return self._get(Gauge, name, help, labels, fn)
+
+    def histogram(self, name: str, help: str = '', scale: float = 1.0, **labels) -> Histogram:
+        return self._get(Histogram, name, help, labels, scale)
+
+    def unregister(self, **labels):
+        """Drop every metric carrying these labels (e.g. station='line1')"""
+        want = set(labels.items())
+        with self._lock:
+            for key in [k for k in self._metrics if want <= set(k[1])]:
+                del self._metrics[key]
+
+    # --- Export ---
+    def snapshot(self) -> dict:
+        """{'name{label="v"}': value}; histograms map to a dict of count/sum/quantiles"""
+        with self._lock:
+            items = sorted(self._metrics.items())
+        out = {}
+        for (name, labels), m in items:
+            try:
+                out[name + _label_str(labels)] = m.get()
+            except Exception:
+                continue
+        return out
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (histograms as summaries)"""
+        with self._lock:
+            items = sorted(self._metrics.items())
+        lines = []
+        last = None
+        for (name, labels), m in items:
+            try:
+                value = m.get()
+            except Exception:
+                continue
+            if name != last:
+                last = name
+                if name in self._help:
+                    lines.append(f'# HELP {name} {self._help[name]}')
+                lines.append(f"# TYPE {name} {'summary' if m.kind == 'histogram' else m.kind}")
+            if m.kind != 'histogram':
+                lines.append(f'{name}{_label_str(labels)} {value}')
+                continue
+            for q in Histogram.QUANTILES:
+                lines.append(f'{name}{_label_str(labels + (("quantile", q),))} {value[f"p{q * 100:g}"]:.9g}')
+            lines.append(f'{name}_sum{_label_str(labels)} {value["sum"]:.9g}')
+            lines.append(f'{name}_count{_label_str(labels)} {value["count"]}')
+        lines.append('')
+        return '\n'.join(lines)
+
+    def serve(self, port: int = 9105, host: str = '127.0.0.1') -> 'MetricsServer':
+        """Expose /metrics (Prometheus) and /metrics.json on a daemon thread"""
+        return MetricsServer(self, host, port).start()
+
+
+# ==============================
+# HTTP Endpoint
+# ==============================
+def _handler_class(registry: 'Registry'):
+    """Request handler bound to registry (http.server is only imported when serving)"""
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path == '/metrics':
+                body = self.registry.to_prometheus().encode('utf-8')
+                ctype = 'text/plain; version=0.0.4; charset=utf-8'
+            elif path == '/metrics.json':
+                body = json.dumps(self.registry.snapshot()).encode('utf-8')
+                ctype = 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', ctype)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    Handler.registry = registry
+    return Handler
+
+
+class MetricsServer:
+    def __init__(self, registry: Registry, host: str = '127.0.0.1', port: int = 9105):
+        from http.server import ThreadingHTTPServer
+        self._httpd = ThreadingHTTPServer((host, port), _handler_class(registry))
+        self._httpd.daemon_threads = True
+        self.host, self.port = self._httpd.server_address[:2]
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+
+
+# ==============================
+# Client Binding
+# ==============================
+class ClientMetrics:
+    """Metrics of one ReconnectingClient, labelled station=<name>.
+
+    Totals the client already keeps (bytes, recv calls, resyncs, reconnects,
+    send errors, queue depth) are exported as callback metrics; only frames
+    per command and request latency are updated from the receive thread.
+    """
+    def __init__(self, registry: Registry, station: str, client):
+        self.registry = registry
+        self.station = station
+        self._frames = {}
+        st = client.stats
+        r = registry
+        r.counter('csh_rx_bytes_total', 'Bytes received', lambda: st()['bytes_rx'], station=station)
+        r.counter('csh_rx_recv_calls_total', 'recv_into calls', lambda: st()['recv_calls'], station=station)
+        r.counter('csh_parse_resyncs_total', 'Bytes dropped to resynchronise framing',
+                  lambda: st()['parse_resyncs'], station=station)
+        r.counter('csh_reconnects_total', 'Connections re-established after a loss',
+                  lambda: st()['reconnects'], station=station)
+        r.counter('csh_send_errors_total', 'Sends rejected or failed',
+                  lambda: st()['send_errors'], station=station)
+        r.counter('csh_send_dropped_total', 'Sends dropped by the queue overflow policy',
+                  lambda: st()['send_dropped'], station=station)
+        r.gauge('csh_send_queue_depth', 'Commands waiting for the writer thread',
+                lambda: st()['send_queue_depth'], station=station)
+        r.gauge('csh_connected', '1 while connected', lambda: int(client.is_connected), station=station)
+        self.latency = r.histogram('csh_request_latency_seconds', 'request() to decoded response',
+                                   scale=1e-9, station=station)
+
+    def frame(self, frame):
+        """Count one received frame under its command (bare text lines as 'text')"""
+        key = bytes(frame[:4])
+        c = self._frames.get(key)
+        if c is None:
+            cmd = key[:3].decode('ascii', 'replace') if key[3:] == b'@' else 'text'
+            c = self._frames[key] = self.registry.counter(
+                'csh_rx_frames_total', 'Frames received per command', station=self.station, cmd=cmd)
+        c.value += 1
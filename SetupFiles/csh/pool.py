@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+#
+# Multi-station connection manager
+# - N named connections multiplexed by one selector (epoll/kqueue) in one I/O thread
+# - Per-station auto reconnect with the same backoff as ReconnectingClient
+# - Frames are routed to frame_cb(station, frame) from the I/O thread
+
+import errno
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+
+from .protocol import FrameParser, RxBuffer, encode_ascii, encode_cmd
+
+
+# ==============================
+# Station
+# ==============================
+class Station:
+    """Connection state for one CSH server inside a StationPool"""
+    def __init__(self, name: str, host: str, port: int, lock=None):
+        self.name = name
+        self.host = host.strip()
+        self.port = int(port)
+        # Resolved once here: getaddrinfo blocks and must not run on the I/O thread
+        self.family, _, _, _, self.addr = socket.getaddrinfo(
+            self.host, self.port, type=socket.SOCK_STREAM)[0]
+        self.lock = lock or threading.Lock()   # guards out (the pool's lock)
+        self.sock = None
+        self.connected = False
+        self.ring = RxBuffer()
+        self.parser = FrameParser()
+        self.out = deque()          # pending writes (memoryviews)
+        self.backoff = 0.5
+        self.retry_at = 0.0
+        self.connect_deadline = 0.0
+        # Stats
+        self.bytes_rx = 0
+        self.bytes_tx = 0
+        self.frames_rx = 0
+        self.reconnects = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            tx_queued = sum(len(b) for b in self.out)
+        return {
+            'connected': self.connected,
+            'bytes_rx': self.bytes_rx,
+            'bytes_tx': self.bytes_tx,
+            'frames_rx': self.frames_rx,
+            'reconnects': self.reconnects,
+            'tx_queued': tx_queued,
+        }
+
+
+# ==============================
+# Station Pool
+# ==============================
+class StationPool:
+    """Talk to many CSH servers from a single I/O thread.
+
+    All sockets are non-blocking and registered with one selector, so the
+    thread count stays at one and idle stations cost nothing. Sends from
+    other threads are queued per station and the selector is woken through
+    a socketpair.
+    """
+    RECV_SIZE = 64 * 1024
+    CONNECT_TIMEOUT = 5.0   # same as ReconnectingClient; a blackholed SYN would wait ~2 min
+
+    def __init__(self, frame_cb, log_cb=None):
+        self._frame_cb = frame_cb
+        self._log_cb = log_cb
+        self._stations = {}
+        self._retired = []
+        self._sel = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._sel.register(self._wake_r, selectors.EVENT_READ, None)
+        self._stop_evt = threading.Event()
+        self._thread = None
+        self._recv_buf = bytearray(self.RECV_SIZE)
+
+    # --- Stations ---
+    def add(self, name: str, host: str, port: int):
+        """Register a station; host is resolved here (OSError if it cannot be)"""
+        st = Station(name, host, port, self._lock)
+        with self._lock:
+            if name in self._stations:
+                raise ValueError(f'station {name} already exists')
+            self._stations[name] = st
+        self._wake()
+
+    def remove(self, name: str):
+        """Drop a station; its socket is closed by the I/O thread"""
+        with self._lock:
+            st = self._stations.pop(name, None)
+            if st is not None:
+                self._retired.append(st)
+        self._wake()
+
+    @property
+    def names(self):
+        return list(self._stations)
+
+    def is_connected(self, name: str) -> bool:
+        st = self._stations.get(name)
+        return bool(st and st.connected)
+
+    # --- Control ---
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_evt.clear()
+        self._thread = threading.Thread(target=self._runner, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_evt.set()
+        self._wake()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        with self._lock:
+            retired, self._retired = self._retired, []
+        for st in retired + list(self._stations.values()):
+            self._close(st, reconnect=False)
+
+    def close(self):
+        """stop() and release the selector and wakeup socketpair; the pool cannot be started again"""
+        self.stop()
+        self._sel.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Send API ---
+    def send_cmd(self, name: str, cmd: str):
+        """Send command without arguments to one station"""
+        self._queue(self._stations[name], encode_cmd(cmd))
+
+    def send_ascii(self, name: str, cmd: str, *args: str):
+        """Send tokenized command CMD@arg@...@\\r\\n to one station"""
+        self._queue(self._stations[name], encode_ascii(cmd, *args))
+
+    def broadcast(self, cmd: str, *args: str):
+        """Send the same tokenized command to every station"""
+        data = encode_ascii(cmd, *args)
+        for st in list(self._stations.values()):
+            self._queue(st, data)
+
+    # --- Stats ---
+    def stats(self) -> dict:
+        """Per-station stats plus totals across the pool"""
+        per = {name: st.stats() for name, st in list(self._stations.items())}
+        total = {
+            'stations': len(per),
+            'connected': sum(1 for s in per.values() if s['connected']),
+        }
+        for key in ('bytes_rx', 'bytes_tx', 'frames_rx', 'reconnects', 'tx_queued'):
+            total[key] = sum(s[key] for s in per.values())
+        return {'total': total, 'stations': per}
+
+    # --- Internals ---
+    def _log(self, s):
+        if self._log_cb is None:
+            return
+        try:
+            self._log_cb(s)
+        except Exception:
+            pass
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass
+
+    def _queue(self, st: Station, data: bytes):
+        if not st.connected:
+            self._log(f'[{st.name}] [TX] send error: Not connected\r\n')
+            return
+        with self._lock:
+            st.out.append(memoryview(data))
+        self._wake()
+
+    def _connect(self, st: Station):
+        self._log(f'[{st.name}] [Client] Connecting to {st.host}:{st.port}...\r\n')
+        s = socket.socket(st.family, socket.SOCK_STREAM)
+        s.setblocking(False)
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        err = s.connect_ex(st.addr)
+        if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+            s.close()
+            raise OSError(err, errno.errorcode.get(err, str(err)))
+        st.sock = s
+        st.connect_deadline = time.monotonic() + self.CONNECT_TIMEOUT
+        st.ring.clear()
+        st.parser.reset()
+        self._sel.register(s, selectors.EVENT_READ | selectors.EVENT_WRITE, st)
+
+    def _close(self, st: Station, reconnect: bool = True):
+        s, st.sock = st.sock, None
+        was_connected, st.connected = st.connected, False
+        if s is not None:
+            try:
+                self._sel.unregister(s)
+            except (KeyError, ValueError):
+                pass
+            try:
+                s.close()
+            except Exception:
+                pass
+        with self._lock:
+            st.out.clear()
+        if reconnect:
+            if was_connected:
+                st.reconnects += 1
+            st.retry_at = time.monotonic() + st.backoff
+            st.backoff = min(st.backoff * 2.0, 5.0)
+
+    def _on_writable(self, st: Station):
+        if not st.connected:
+            err = st.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+            if err:
+                raise OSError(err, errno.errorcode.get(err, str(err)))
+            st.connected = True
+            st.backoff = 0.5
+            self._log(f'[{st.name}] [Client] Connected\r\n')
+        with self._lock:
+            while st.out:
+                buf = st.out[0]
+                n = st.sock.send(buf)
+                st.bytes_tx += n
+                if n < len(buf):
+                    st.out[0] = buf[n:]
+                    break
+                st.out.popleft()
+
+    def _on_readable(self, st: Station):
+        n = st.sock.recv_into(self._recv_buf)
+        if n == 0:
+            raise ConnectionError('remote closed')
+        st.bytes_rx += n
+        st.ring.extend(memoryview(self._recv_buf)[:n])
+        while True:
+            frame = st.parser.try_extract(st.ring)
+            if frame is None:
+                break
+            st.frames_rx += 1
+            try:
+                self._frame_cb(st.name, frame)
+            except Exception:
+                import traceback; traceback.print_exc()
+
+    # --- Main loop ---
+    def _runner(self):
+        while not self._stop_evt.is_set():
+            if self._retired:
+                with self._lock:
+                    retired, self._retired = self._retired, []
+                for st in retired:
+                    self._close(st, reconnect=False)
+            now = time.monotonic()
+            timeout = None
+            for st in list(self._stations.values()):
+                if st.sock is not None and not st.connected and now >= st.connect_deadline:
+                    self._log(f'[{st.name}] [Client] connect/read error: timed out\r\n')
+                    self._close(st)
+                if st.sock is None:
+                    if now >= st.retry_at:
+                        try:
+                            self._connect(st)
+                        except Exception as ex:
+                            self._log(f'[{st.name}] [Client] connect/read error: {ex}\r\n')
+                            self._close(st)
+                    if st.sock is None:
+                        wait = st.retry_at - now
+                        timeout = wait if timeout is None else min(timeout, wait)
+                        continue
+                if not st.connected:
+                    wait = st.connect_deadline - now
+                    timeout = wait if timeout is None else min(timeout, wait)
+                # Only ask for writability while connecting or with queued data
+                want = selectors.EVENT_READ
+                if not st.connected or st.out:
+                    want |= selectors.EVENT_WRITE
+                if self._sel.get_key(st.sock).events != want:
+                    self._sel.modify(st.sock, want, st)
+
+            for key, events in self._sel.select(None if timeout is None else max(0.0, timeout)):
+                st = key.data
+                if st is None:
+                    try:
+                        while self._wake_r.recv(4096):
+                            pass
+                    except (BlockingIOError, OSError):
+                        pass
+                    continue
+                if st.sock is None or st.sock is not key.fileobj:
+                    continue
+                try:
+                    if events & selectors.EVENT_WRITE:
+                        self._on_writable(st)
+                    if events & selectors.EVENT_READ and st.sock is not None:
+                        self._on_readable(st)
+                except (BlockingIOError, InterruptedError):
+                    pass
+                except Exception as ex:
+                    self._log(f'[{st.name}] [Client] connect/read error: {ex}\r\n')
+                    self._close(st)
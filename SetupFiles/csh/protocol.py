@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+#
+# CSH wire protocol: framing and command encoding
+# - Protocol: "CMD@arg@...@\r\n", A_D, A_R, A_M
+# - Same framing rules as the C# DefaultFrameParser
+
+# ==============================
+# Receive Buffer
+# ==============================
+class RxBuffer:
+    """Byte buffer with read/write cursors for the receive path.
+
+    Consumed bytes are skipped by advancing the read offset instead of
+    deleting from the front, so pulling many small frames out of one large
+    recv costs O(total bytes). Live data is compacted to the front only when
+    the tail runs out of room, and the storage grows when more than half of
+    it is live.
+    """
+    def __init__(self, capacity: int = 64 * 1024):
+        self._buf = bytearray(capacity)
+        self._rd = 0
+        self._wr = 0
+
+    def __len__(self):
+        return self._wr - self._rd
+
+    def clear(self):
+        self._rd = self._wr = 0
+
+    def reserve(self, n: int):
+        """Make room for at least n more bytes after the write offset"""
+        if self._wr + n <= len(self._buf):
+            return
+        live = self._wr - self._rd
+        if live + n > len(self._buf) // 2:
+            buf = bytearray(max(len(self._buf) * 2, live + n))
+            buf[:live] = self._buf[self._rd:self._wr]
+            self._buf = buf
+        else:
+            self._buf[:live] = self._buf[self._rd:self._wr]
+        self._rd, self._wr = 0, live
+
+    def write_view(self, n: int) -> memoryview:
+        """Writable view of at least n free bytes after the write offset.
+
+        Fill it (e.g. with socket.recv_into) and then call commit().
+        """
+        self.reserve(n)
+        return memoryview(self._buf)[self._wr:]
+
+    def commit(self, n: int):
+        """Mark n bytes written through write_view() as received"""
+        self._wr += n
+
+    def extend(self, data):
+        n = len(data)
+        self.reserve(n)
+        self._buf[self._wr:self._wr + n] = data
+        self._wr += n
+
+    def startswith(self, prefix) -> bool:
+        return self._buf.startswith(prefix, self._rd, self._wr)
+
+    def find(self, sub, start: int = 0, end: int = None) -> int:
+        """Like bytes.find, with offsets relative to the read cursor"""
+        stop = self._wr if end is None else min(self._wr, self._rd + end)
+        i = self._buf.find(sub, self._rd + start, stop)
+        return i - self._rd if i >= 0 else -1
+
+    def peek(self, start: int, end: int) -> bytes:
+        return bytes(self._buf[self._rd + start:min(self._wr, self._rd + end)])
+
+    def skip(self, n: int):
+        self._rd += n
+        if self._rd >= self._wr:
+            self._rd = self._wr = 0
+
+    def take(self, n: int) -> bytes:
+        """Copy out and consume the next n bytes"""
+        data = bytes(self._buf[self._rd:self._rd + n])
+        self.skip(n)
+        return data
+
+    def take_view(self, n: int) -> memoryview:
+        """Consume the next n bytes without copying.
+
+        The view aliases the buffer storage: it is only valid until the
+        buffer is written to again, so consumers that keep the data must
+        copy it (bytes(view)) before returning.
+        """
+        view = memoryview(self._buf)[self._rd:self._rd + n]
+        self.skip(n)
+        return view
+
+
+# ==============================
+# Frame Parser
+# ==============================
+class FrameParser:
+    """Incremental framing with the same rules as the C# DefaultFrameParser.
+
+    A_R/A_D frames are length-driven: once the count token is known the
+    frame size is fixed (A_D: count*8, A_R: 44 + count*48 payload bytes),
+    so only the 3-byte '@\\r\\n' tail is checked and the binary payload is
+    never scanned. Everything else is a plain line terminated by CRLF.
+
+    The parser keeps its phase and scan position between calls, so a frame
+    that arrives over many recv chunks is examined only once per new byte.
+    Call reset() whenever the underlying buffer is cleared.
+
+    With views=True frames are returned as memoryviews into the buffer
+    (see RxBuffer.take_view) instead of bytes copies.
+    """
+    A_R_HEADER_SIZE = 44
+    A_R_FRAME_BYTES = 8 * 6
+    MAX_COUNT_DIGITS = 10
+    MAX_COUNT = 2 ** 31 - 1   # int.TryParse range; larger counts resync like the C# parser
+
+    # Phases
+    CMD, COUNT, PAYLOAD, LINE = range(4)
+
+    _BINARY_PREFIXES = (b'A_D@', b'A_R@')
+
+    def __init__(self, views: bool = False):
+        self._take = RxBuffer.take_view if views else RxBuffer.take
+        self.resyncs = 0     # bytes dropped by _resync, never reset
+        self.reset()
+
+    def reset(self):
+        self.phase = FrameParser.CMD
+        self.cmd = None
+        self.frame_len = 0   # total frame size once the header is known
+        self._scan = 0       # bytes of the pending frame already searched
+
+    @staticmethod
+    def payload_len(cmd: str, count: int) -> int:
+        """Payload size announced by an A_D/A_R header"""
+        if cmd == 'A_D':
+            return count * 8
+        return FrameParser.A_R_HEADER_SIZE + count * FrameParser.A_R_FRAME_BYTES
+
+    def try_extract(self, src: RxBuffer):
+        """Try to extract one complete frame from buffer"""
+        while True:
+            avail = len(src)
+            phase = self.phase
+
+            if phase == FrameParser.PAYLOAD:
+                if avail < self.frame_len:
+                    return None
+                if src.peek(self.frame_len - 3, self.frame_len) != b'@\r\n':
+                    self._resync(src)
+                    continue
+                frame = self._take(src, self.frame_len)
+                self.reset()
+                return frame
+
+            if phase == FrameParser.CMD:
+                if avail < 4:
+                    head = src.peek(0, avail)
+                    if any(p.startswith(head) for p in FrameParser._BINARY_PREFIXES):
+                        return None
+                if src.startswith(FrameParser._BINARY_PREFIXES):
+                    self.phase = FrameParser.COUNT
+                    self.cmd = src.peek(0, 3).decode('ascii')
+                    self._scan = 4
+                else:
+                    self.phase = FrameParser.LINE
+                    self._scan = 0
+                continue
+
+            if phase == FrameParser.COUNT:
+                # CMD@<count>@<payload>@\r\n
+                limit = 5 + FrameParser.MAX_COUNT_DIGITS
+                at2 = src.find(b'@', self._scan, limit)
+                if at2 < 0:
+                    if avail >= limit:
+                        self._resync(src)
+                        continue
+                    self._scan = avail
+                    return None
+                # ASCII digits only: int() would also take '1_0', ' 5' or '+5'
+                digits = src.peek(4, at2)
+                token = int(digits) if digits.isdigit() else -1
+                if not 0 <= token <= FrameParser.MAX_COUNT:
+                    self._resync(src)
+                    continue
+                self.frame_len = at2 + 1 + FrameParser.payload_len(self.cmd, token) + 3
+                self.phase = FrameParser.PAYLOAD
+                continue
+
+            # Plain ASCII line (CMD@arg@...@\r\n or bare text)
+            crlf = src.find(b'\r\n', max(0, self._scan - 1))
+            if crlf < 0:
+                self._scan = avail
+                return None
+            frame = self._take(src, crlf + 2)
+            self.reset()
+            return frame
+
+    def _resync(self, src: RxBuffer):
+        """Drop one byte and restart framing, like the C# parser"""
+        self.resyncs += 1
+        src.skip(1)
+        self.reset()
+
+
+# ==============================
+# Command Encoding
+# ==============================
+# Response frame the server sends for each request (Form1.Network_FrameReceived)
+RESPONSE_FOR = {
+    'R_S': 'A_R',
+    'R_C': 'A_R',
+    'D_S': 'A_D',
+    'M_S': 'A_M',
+}
+
+
+def check_request(cmd: str, args) -> str:
+    """Response cmd for a request; ValueError for one the server would drop unanswered"""
+    resp = RESPONSE_FOR.get(cmd)
+    if resp is None:
+        raise ValueError(f'{cmd} has no response frame')
+    if cmd in ('R_S', 'R_C'):
+        # The server logs "arg parse fail" and sends nothing for a bad count
+        count = str(args[0]) if args else ''
+        if not (count.isascii() and count.isdigit() and int(count) <= FrameParser.MAX_COUNT):
+            raise ValueError(f'{cmd} needs a frame count in 0..{FrameParser.MAX_COUNT}, '
+                             f'got {args[0] if args else None!r}')
+    return resp
+
+
+def frame_cmd(frame) -> str:
+    """Command token of a complete frame (bytes or memoryview; '' for bare lines)"""
+    head = bytes(frame[:16])
+    first_at = head.find(b'@')
+    if first_at <= 0:
+        return ''
+    return head[:first_at].decode('ascii', errors='ignore')
+
+
+def encode_cmd(cmd: str) -> bytes:
+    """Command without arguments, always terminated by '@\\r\\n'"""
+    if not cmd.endswith('@'):
+        cmd += '@'
+    if not cmd.endswith("\r\n"):
+        cmd += "\r\n"
+    return cmd.encode('ascii', errors='ignore')
+
+
+def encode_ascii(cmd: str, *args: str) -> bytes:
+    """Tokenized command: CMD@arg@...@\\r\\n"""
+    parts = [cmd or '']
+    for a in args:
+        parts.append('@')
+        parts.append('' if a is None else str(a))
+    parts.append('@\r\n')
+    return ''.join(parts).encode('ascii', errors='ignore')
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+#
+# Per-stage timing hooks
+# - Stages: recv, parse, dispatch (ReconnectingClient), decode and render (UI)
+# - A sink is any object with add(stage, cmd, ns); None disables timing at every site
+# - StageSink aggregates per command/stage histograms and dumps a breakdown on demand or SIGUSR1
+
+import signal
+import sys
+import threading
+
+from .metrics import Histogram
+
+STAGES = ('recv', 'parse', 'decode', 'dispatch', 'render')
+ANY_CMD = '*'   # stage cost not tied to one frame (e.g. a recv before the header is known)
+
+
+# ==============================
+# Stage Sink
+# ==============================
+class StageSink:
+    """Aggregates stage costs (nanoseconds) per command.
+
+    Instrumented code checks `if timing is not None` around each stage, so
+    without a sink the only cost is that test. dispatch is the whole
+    frame_cb call and therefore includes decode when frame_cb decodes.
+    """
+    def __init__(self):
+        self._hist = {}   # (cmd, stage) -> Histogram
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, cmd: str, ns: int):
+        h = self._hist.get((cmd, stage))
+        if h is None:
+            with self._lock:
+                h = self._hist.setdefault((cmd, stage), Histogram(scale=1e-3))
+        h.record(ns)
+
+    def reset(self):
+        with self._lock:
+            self._hist = {}
+
+    def snapshot(self) -> dict:
+        """{cmd: {stage: {count, sum, min, max, p50, ...}}} in microseconds"""
+        with self._lock:
+            items = sorted(self._hist.items())
+        out = {}
+        for (cmd, stage), h in items:
+            out.setdefault(cmd, {})[stage] = h.get()
+        return out
+
+    def report(self) -> str:
+        """Breakdown table, one row per command and stage"""
+        rows = []
+        order = {s: i for i, s in enumerate(STAGES)}
+        with self._lock:
+            items = list(self._hist.items())
+        items.sort(key=lambda kv: (kv[0][0], order.get(kv[0][1], 99), kv[0][1]))
+        grand = sum(h.sum for _, h in items) or 1
+        rows.append(f"{'cmd':<5} {'stage':<9} {'count':>9} {'total ms':>10} {'share':>6} "
+                    f"{'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'max us':>10}")
+        for (cmd, stage), h in items:
+            st = h.get()
+            mean = st['sum'] / st['count'] if st['count'] else 0.0
+            rows.append(f"{cmd or '-':<5} {stage:<9} {st['count']:>9} {st['sum'] / 1e3:>10.1f} "
+                        f"{h.sum / grand:>6.1%} {mean:>9.1f} {st['p50']:>9.1f} {st['p99']:>9.1f} "
+                        f"{st['max']:>10.1f}")
+        return '\n'.join(rows)
+
+    def dump(self, out=None):
+        out = out or sys.stderr
+        out.write(self.report() + '\n')
+        out.flush()
+
+    def install_signal(self, signum=None, out=None) -> bool:
+        """Dump the breakdown when signum (default SIGUSR1) arrives; False where unsupported"""
+        if signum is None:
+            signum = getattr(signal, 'SIGUSR1', None)
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return False
+        signal.signal(signum, lambda *_: self.dump(out))
+        return True
@@ -0,0 +1,594 @@
+# -*- coding: utf-8 -*-
+#
+# TCP transport for the C# CSH server
+# - Auto connect + auto reconnect (only if connection is lost)
+# - Frames are delivered raw to frame_cb from the receive thread
+# - request() correlates R_S/R_C/D_S/M_S with their response frame
+# - Sends are queued and written by a dedicated writer thread, coalesced per wakeup
+# - The receive thread blocks in a selector; stop()/reconfigure wake it through a socketpair
+
+import errno
+import os
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError
+
+from .decode import decode_frame
+from .protocol import FrameParser, RxBuffer, check_request, encode_ascii, encode_cmd, frame_cmd
+from .timing import ANY_CMD
+
+
+class _RemoteClosed(Exception):
+    pass
+
+
+# ==============================
+# Send Queue
+# ==============================
+class SendQueue:
+    """Bounded FIFO of outgoing commands drained by the writer thread.
+
+    Each item is (data, on_done); on_done(exc) is called once the data has
+    been written (exc is None) or dropped/failed. When the queue is full
+    the overflow policy decides: DROP_NEW rejects the new command, DROP_OLD
+    evicts the oldest queued one, BLOCK waits up to block_timeout for room.
+    """
+    DROP_NEW, DROP_OLD, BLOCK = 'drop_new', 'drop_old', 'block'
+
+    def __init__(self, maxlen: int = 1024, overflow: str = DROP_NEW, block_timeout: float = 1.0):
+        if overflow not in (self.DROP_NEW, self.DROP_OLD, self.BLOCK):
+            raise ValueError(f'unknown overflow policy {overflow!r}')
+        self.maxlen = maxlen
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self._q = deque()
+        self._cv = threading.Condition()
+        self._woken = False
+
+    def __len__(self):
+        return len(self._q)
+
+    def put(self, data: bytes, on_done=None) -> bool:
+        """Queue data; False if the overflow policy rejected it"""
+        evicted = None
+        with self._cv:
+            if len(self._q) >= self.maxlen:
+                if self.overflow == self.DROP_OLD:
+                    evicted = self._q.popleft()
+                elif self.overflow == self.BLOCK:
+                    self._cv.wait_for(lambda: len(self._q) < self.maxlen, self.block_timeout)
+                if len(self._q) >= self.maxlen:
+                    self.dropped += 1
+                    return False
+            self._q.append((data, on_done))
+            self._cv.notify_all()
+        if evicted is not None:
+            self.dropped += 1
+            _complete([evicted], BufferError('send queue overflow'))
+        return True
+
+    def take_all(self, timeout: float = None):
+        """Wait for queued items (or wake()) and remove them all"""
+        with self._cv:
+            if not self._q and not self._woken:
+                self._cv.wait(timeout)
+            self._woken = False
+            items = list(self._q)
+            self._q.clear()
+            self._cv.notify_all()
+        return items
+
+    def wake(self):
+        with self._cv:
+            self._woken = True
+            self._cv.notify_all()
+
+    def fail_all(self, ex: Exception):
+        _complete(self.take_all(0), ex)
+
+
+def _complete(items, ex):
+    for _, on_done in items:
+        if on_done is not None:
+            try:
+                on_done(ex)
+            except Exception:
+                import traceback; traceback.print_exc()
+
+
+# ==============================
+# Reconnecting TCP Client
+# ==============================
+class ReconnectingClient:
+    """Threaded client with auto reconnect.
+
+    Received bytes go straight from the kernel into the RxBuffer with
+    recv_into. By default frame_cb gets a bytes copy of each frame; with
+    zero_copy=True it gets a memoryview into the receive buffer instead,
+    valid only until frame_cb returns (copy it, or use ResultData.copy(),
+    to keep it).
+
+    Pass a metrics.Registry as metrics= to export the client's counters
+    labelled station=<station> (see metrics.ClientMetrics). Pass a
+    timing.StageSink (or any object with add(stage, cmd, ns)) as timing=
+    to time the recv, parse and dispatch stages. start_capture(path)
+    records every received chunk to a capture file (see capture.py).
+    """
+    RECV_SIZE = 8192                 # read size while no frame length is known
+    MAX_RECV_SIZE = 4 * 1024 * 1024  # cap for a single recv_into
+    MAX_RCVBUF = 8 * 1024 * 1024     # cap for SO_RCVBUF growth
+    MAX_FRAME_BYTES = 256 * 1024 * 1024  # announced frames up to this size are reserved whole
+    STALE_REQUEST_GRACE = 10.0       # seconds a timed-out request waits for its late response
+
+    def __init__(self, log_cb, frame_cb, send_queue_size: int = 1024, overflow: str = SendQueue.DROP_NEW,
+                 zero_copy: bool = False, metrics=None, station: str = 'default', timing=None):
+        self._log_cb = log_cb
+        self._timing = timing
+        self._capture = None
+        self._conn_id = 0
+        self._frame_cb = frame_cb
+        self._zero_copy = zero_copy
+        self._sock = None
+        self._send_q = SendQueue(send_queue_size, overflow)
+        self._stop_evt = threading.Event()
+        self._connected = False
+        self._host = '127.0.0.1'
+        self._port = 5000
+        self._thread = None
+        self._writer = None
+        # Wakes the receive thread out of select() for stop/reconfigure
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._reconfig = False
+        # Receive sizing, grown from announced A_R/A_D frame lengths
+        self._rcvbuf_want = 0
+        self._rx_stats = {'recv_calls': 0, 'bytes_rx': 0, 'recv_size': self.RECV_SIZE,
+                          'recv_size_max': self.RECV_SIZE, 'rcvbuf': 0, 'reconnects': 0}
+        self._parser = None
+        self._send_errors = 0
+        # Outstanding requests per response cmd, oldest first: (future, deadline)
+        self._req_lock = threading.RLock()
+        self._pending = {}
+        self._metrics = None
+        if metrics is not None:
+            from .metrics import ClientMetrics
+            self._metrics = ClientMetrics(metrics, station, self)
+
+    @property
+    def is_connected(self):
+        return self._connected
+
+    def start(self, host, port):
+        """Start connection with auto-reconnect (reconnects if host/port changed)"""
+        host, port = host.strip(), int(port)
+        changed = (host, port) != (self._host, self._port)
+        self._host, self._port = host, port
+        if self._thread and self._thread.is_alive():
+            if changed:
+                self._reconfig = True
+                self._wake()
+            return
+        self._stop_evt.clear()
+        self._thread = threading.Thread(target=self._runner, daemon=True)
+        self._thread.start()
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def stop(self):
+        """Stop connection; returns as soon as both threads have exited"""
+        self._stop_evt.set()
+        self._wake()
+        self._send_q.wake()
+        try:
+            if self._sock:
+                # Unblocks a writer stuck in sendall on a dead peer
+                self._sock.shutdown(socket.SHUT_RDWR)
+        except Exception:
+            pass
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        if self._writer:
+            self._writer.join(timeout=2.0)
+        self._send_q.fail_all(ConnectionError('client stopped'))
+        self.stop_capture()
+
+    def close(self):
+        """stop() and release the wakeup socketpair; the client cannot be started again"""
+        self.stop()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- Capture ---
+    def start_capture(self, path: str, **kwargs):
+        """Record every received chunk to path; returns the CaptureWriter"""
+        from .capture import CaptureWriter
+        self.stop_capture()
+        cap = CaptureWriter(path, **kwargs)
+        if self._connected:
+            cap.connect(self._conn_id, f'{self._host}:{self._port}')
+        self._capture = cap
+        return cap
+
+    def stop_capture(self):
+        """Stop recording and close the capture file"""
+        cap, self._capture = self._capture, None
+        if cap is not None:
+            cap.close()
+
+    @property
+    def send_queue_depth(self) -> int:
+        return len(self._send_q)
+
+    def stats(self) -> dict:
+        """Receive/send counters and the currently chosen recv/SO_RCVBUF sizes"""
+        st = dict(self._rx_stats)
+        st['parse_resyncs'] = self._parser.resyncs if self._parser is not None else 0
+        st['send_queue_depth'] = len(self._send_q)
+        st['send_errors'] = self._send_errors
+        st['send_dropped'] = self._send_q.dropped
+        return st
+
+    # --- Send API ---
+    # Sends never block the caller on the socket: data is queued for the
+    # writer thread and on_done(exc) reports the outcome (exc None = written).
+    def send_cmd(self, cmd: str, on_done=None) -> bool:
+        """Send command without arguments, always append '@\\r\\n'"""
+        return self._send_raw(encode_cmd(cmd), on_done)
+
+    def send_ascii(self, cmd: str, *args: str, on_done=None) -> bool:
+        """Send tokenized command: CMD@arg@...@\\r\\n"""
+        return self._send_raw(encode_ascii(cmd, *args), on_done)
+
+    def request(self, cmd: str, *args, timeout: float = None) -> Future:
+        """Send a request and return a Future for its decoded response.
+
+        The server answers requests on one connection in order, so each
+        response frame (see RESPONSE_FOR) resolves the oldest outstanding
+        request expecting it. A request that times out keeps its slot for
+        STALE_REQUEST_GRACE seconds, so a late response does not shift the
+        matching; after that the slot is dropped, so a request the server
+        never answers cannot shift it for the rest of the connection.
+        R_S/R_C counts the server would reject raise ValueError up front.
+        """
+        resp = check_request(cmd, args)
+        fut = Future()
+        entry = (fut, time.monotonic() + timeout if timeout else None, time.perf_counter_ns())
+        def on_sent(ex):
+            if ex is None:
+                return
+            # Never written: free the slot so it cannot claim another response
+            with self._req_lock:
+                try:
+                    q.remove(entry)
+                except ValueError:
+                    pass
+            try:
+                fut.set_exception(ConnectionError(f'{cmd} not sent: {ex}'))
+            except InvalidStateError:
+                pass
+
+        with self._req_lock:
+            q = self._pending.setdefault(resp, deque())
+            q.append(entry)
+            self._send_raw(encode_ascii(cmd, *args), on_sent)
+        if timeout:
+            # The receive thread may be idle in select(None); make it pick up the deadline
+            self._wake()
+        return fut
+
+    async def request_async(self, cmd: str, *args, timeout: float = None):
+        """Awaitable form of request() for asyncio callers"""
+        import asyncio
+        return await asyncio.wrap_future(self.request(cmd, *args, timeout=timeout))
+
+    def _resolve_request(self, frame: bytes):
+        q = self._pending.get(frame_cmd(frame))
+        if not q:
+            return
+        with self._req_lock:
+            if not q:
+                return
+            fut, _, t_sent = q.popleft()
+        if self._metrics is not None:
+            self._metrics.latency.record(time.perf_counter_ns() - t_sent)
+        if not fut.done():
+            if not isinstance(frame, bytes):
+                frame = bytes(frame)   # the result outlives the receive buffer
+            try:
+                fut.set_result(decode_frame(frame))
+            except InvalidStateError:
+                pass
+
+    def _expire_requests(self):
+        """Fail overdue requests, drop stale slots; returns the next deadline or None"""
+        now = time.monotonic()
+        grace = self.STALE_REQUEST_GRACE
+        expired = []
+        next_deadline = None
+        with self._req_lock:
+            for resp, q in self._pending.items():
+                stale = []
+                for entry in q:
+                    fut, deadline, _ = entry
+                    if deadline is None:
+                        continue
+                    if deadline + grace <= now:
+                        stale.append(entry)
+                        expired.append(fut)
+                        continue
+                    if deadline <= now:
+                        expired.append(fut)
+                        deadline += grace
+                    if next_deadline is None or deadline < next_deadline:
+                        next_deadline = deadline
+                for entry in stale:
+                    q.remove(entry)
+                if stale:
+                    self._log(f'[REQ] {len(stale)} timed-out {resp} request(s) dropped, '
+                              f'no response within {grace:g}s\r\n')
+        for fut in expired:
+            if fut.done():
+                continue
+            try:
+                fut.set_exception(TimeoutError('no response'))
+            except InvalidStateError:
+                pass
+        return next_deadline
+
+    def _fail_requests(self, ex: Exception):
+        with self._req_lock:
+            futs = [fut for q in self._pending.values() for fut, _, _ in q]
+            self._pending.clear()
+        for fut in futs:
+            try:
+                fut.set_exception(ex)
+            except InvalidStateError:
+                pass
+
+    def _log(self, s):
+        try:
+            self._log_cb(s)
+        except Exception:
+            pass
+
+    def _send_raw(self, data: bytes, on_done=None) -> bool:
+        ex = None
+        if not self._sock:
+            ex = RuntimeError('Not connected')
+        elif not self._send_q.put(data, on_done):
+            ex = BufferError(f'send queue full ({self._send_q.maxlen})')
+        else:
+            return True
+        self._send_errors += 1
+        self._log(f'[TX] send error: {ex}\r\n')
+        _complete([(data, on_done)], ex)
+        return False
+
+    def _write_loop(self):
+        """Writer thread: one sendall per wakeup for everything queued"""
+        while not self._stop_evt.is_set():
+            items = self._send_q.take_all()
+            if not items:
+                continue
+            ex = None
+            try:
+                sock = self._sock
+                if not sock:
+                    raise RuntimeError('Not connected')
+                if len(items) == 1:
+                    sock.sendall(items[0][0])
+                else:
+                    sock.sendall(b''.join([data for data, _ in items]))
+            except Exception as e:
+                ex = e
+                self._send_errors += len(items)
+                self._log(f'[TX] send error: {ex}\r\n')
+            _complete(items, ex)
+
+    # --- Main loop ---
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass
+
+    def _drain_wake(self):
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+
+    def _interrupted(self) -> bool:
+        return self._stop_evt.is_set() or self._reconfig
+
+    def _connect(self, sel):
+        """Non-blocking connect that stop()/reconfigure can interrupt"""
+        if self._host.startswith('unix:'):
+            # start('unix:/path/to.sock', 0) talks to a local emulator over a Unix socket
+            family, stype, proto, addr = socket.AF_UNIX, socket.SOCK_STREAM, 0, self._host[5:]
+        else:
+            family, stype, proto, _, addr = socket.getaddrinfo(
+                self._host, self._port, type=socket.SOCK_STREAM)[0]
+        s = socket.socket(family, stype, proto)
+        try:
+            if self._rcvbuf_want:
+                # Before connect so the window scale can cover the large buffer
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._rcvbuf_want)
+            s.setblocking(False)
+            err = s.connect_ex(addr)
+            if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                raise OSError(err, os.strerror(err))
+            if err:
+                sel.register(s, selectors.EVENT_WRITE)
+                try:
+                    deadline = time.monotonic() + 5.0
+                    while True:
+                        timeout = deadline - time.monotonic()
+                        if timeout <= 0:
+                            raise TimeoutError('timed out')
+                        ready = [key.fileobj for key, _ in sel.select(timeout)]
+                        if self._wake_r in ready:
+                            self._drain_wake()
+                            if self._interrupted():
+                                return None
+                        if s in ready:
+                            break
+                finally:
+                    sel.unregister(s)
+                err = s.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if err:
+                    raise OSError(err, os.strerror(err))
+            # Blocking mode for the writer's sendall; reads only happen after select()
+            s.setblocking(True)
+            if family != socket.AF_UNIX:
+                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._rx_stats['rcvbuf'] = s.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+            return s
+        except BaseException:
+            s.close()
+            raise
+
+    def _grow_rcvbuf(self, s, frame_len: int):
+        """Raise SO_RCVBUF towards the announced frame length (kept for reconnects)"""
+        want = min(frame_len, self.MAX_RCVBUF)
+        if want <= self._rcvbuf_want:
+            return
+        self._rcvbuf_want = want
+        try:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, want)
+            self._rx_stats['rcvbuf'] = s.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+        except OSError:
+            pass
+
+    def _runner(self):
+        backoff = 0.5
+        parser = self._parser = FrameParser(views=self._zero_copy)
+        ring = RxBuffer()
+        metrics = self._metrics
+        timing = self._timing
+        was_connected = False
+        sel = selectors.DefaultSelector()
+        sel.register(self._wake_r, selectors.EVENT_READ)
+        while not self._stop_evt.is_set():
+            self._reconfig = False
+            try:
+                self._log(f'[Client] Connecting to {self._host}:{self._port}...\r\n')
+                s = self._connect(sel)
+                if s is None:
+                    continue
+                self._sock = s
+                self._connected = True
+                self._conn_id += 1
+                cap = self._capture
+                if cap is not None:
+                    cap.connect(self._conn_id, f'{self._host}:{self._port}')
+                if was_connected:
+                    self._rx_stats['reconnects'] += 1
+                was_connected = True
+                self._log('[Client] Connected\r\n')
+                backoff = 0.5
+                ring.clear()
+                parser.reset()
+                sel.register(s, selectors.EVENT_READ)
+                try:
+                    timeout = None
+                    while not self._interrupted():
+                        for key, _ in sel.select(timeout):
+                            if key.fileobj is self._wake_r:
+                                self._drain_wake()
+                                continue
+                            # Once a frame's length is known, read straight towards its end.
+                            # A frame up to MAX_FRAME_BYTES gets room for all of it once, so it
+                            # is never regrown mid-frame; the announced length is untrusted, so
+                            # a larger one only gets the capped read size and grows as it arrives
+                            need = max(self.RECV_SIZE, parser.frame_len - len(ring))
+                            size = min(need, self.MAX_RECV_SIZE)
+                            if size < need <= self.MAX_FRAME_BYTES:
+                                ring.reserve(need)
+                            if parser.frame_len > self._rcvbuf_want:
+                                self._grow_rcvbuf(s, parser.frame_len)
+                            if timing is not None:
+                                t0 = time.perf_counter_ns()
+                            buf = ring.write_view(size)
+                            n = s.recv_into(buf, size)
+                            if not n:
+                                raise _RemoteClosed('remote closed')
+                            cap = self._capture
+                            if cap is not None:
+                                cap.chunk(self._conn_id, buf[:n])
+                            ring.commit(n)
+                            if timing is not None:
+                                timing.add('recv', parser.cmd or ANY_CMD, time.perf_counter_ns() - t0)
+                            rx = self._rx_stats
+                            rx['recv_calls'] += 1
+                            rx['bytes_rx'] += n
+                            rx['recv_size'] = size
+                            if size > rx['recv_size_max']:
+                                rx['recv_size_max'] = size
+                            while True:
+                                if timing is not None:
+                                    t0 = time.perf_counter_ns()
+                                frame = parser.try_extract(ring)
+                                if frame is None:
+                                    if timing is not None:
+                                        timing.add('parse', parser.cmd or ANY_CMD, time.perf_counter_ns() - t0)
+                                    break
+                                if metrics is not None:
+                                    metrics.frame(frame)
+                                if timing is not None:
+                                    cmd = frame_cmd(frame)
+                                    t1 = time.perf_counter_ns()
+                                    timing.add('parse', cmd, t1 - t0)
+                                try:
+                                    if self._pending:
+                                        self._resolve_request(frame)
+                                    self._frame_cb(frame)
+                                except Exception:
+                                    import traceback; traceback.print_exc()
+                                if timing is not None:
+                                    timing.add('dispatch', cmd, time.perf_counter_ns() - t1)
+                        # Sleep until the next request deadline, or indefinitely
+                        timeout = None
+                        if self._pending:
+                            deadline = self._expire_requests()
+                            if deadline is not None:
+                                timeout = max(0.0, deadline - time.monotonic())
+                finally:
+                    sel.unregister(s)
+            except _RemoteClosed as ex:
+                self._log(f'[RX] {ex}\r\n')
+            except Exception as ex:
+                self._log(f'[Client] connect/read error: {ex}\r\n')
+            finally:
+                if self._connected:
+                    cap = self._capture
+                    if cap is not None:
+                        cap.disconnect(self._conn_id)
+                self._connected = False
+                try:
+                    if self._sock:
+                        self._sock.close()
+                except Exception:
+                    pass
+                self._sock = None
+                if self._pending:
+                    self._fail_requests(ConnectionError('connection lost'))
+            if self._interrupted():
+                continue
+            # Back off before reconnecting; stop()/reconfigure cut the wait short
+            if sel.select(backoff):
+                self._drain_wake()
+            backoff = min(backoff * 2.0, 5.0)
+        sel.close()
@@ -0,0 +1,85 @@
+import asyncio
+import socket
+import threading
+import time
+
+import pytest
+
+from csh.emulator import EmulatorServer
+
+
+class _EmulatorThread:
+    """EmulatorServer on a private event loop thread"""
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.server = EmulatorServer(port=0, log_cb=lambda s: None)
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result(5.0)
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.server.close(), self.loop).result(5.0)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=2.0)
+        self.loop.close()
+
+
+@pytest.fixture
+def emulator():
+    emu = _EmulatorThread().start()
+    yield emu.server
+    emu.stop()
+
+
+@pytest.fixture
+def silent_server():
+    """Listening socket that accepts connections and never answers"""
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.bind(('127.0.0.1', 0))
+    srv.listen()
+    conns = []
+    stop = threading.Event()
+
+    def accept():
+        srv.settimeout(0.05)
+        while not stop.is_set():
+            try:
+                conns.append(srv.accept()[0])
+            except OSError:
+                pass
+
+    t = threading.Thread(target=accept, daemon=True)
+    t.start()
+    yield srv.getsockname()[1]
+    stop.set()
+    t.join(timeout=2.0)
+    for c in conns:
+        c.close()
+    srv.close()
+
+
+def _wait_for(cond, timeout: float = 5.0):
+    t_end = time.monotonic() + timeout
+    while not cond():
+        if time.monotonic() > t_end:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def wait_for():
+    """wait_for(cond, timeout=5.0): poll cond until true; False on timeout"""
+    return _wait_for
+
+
+@pytest.fixture
+def connect(wait_for):
+    """connect(client, port): start a client on loopback and wait until it is connected"""
+    def _connect(client, port):
+        client.start('127.0.0.1', port)
+        assert wait_for(lambda: client.is_connected)
+    return _connect
@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from csh.aio import AsyncClient
+from csh.decode import MarkData, ResultData
+from csh.protocol import frame_cmd
+
+
+def _run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 10.0))
+
+
+def test_requests_resolve_in_order(emulator):
+    async def main():
+        c = AsyncClient()
+        c.start('127.0.0.1', emulator.port)
+        await c.wait_connected(5.0)
+        try:
+            futs = [c.request('R_S', n, timeout=5.0) for n in (3, 1)]
+            futs.append(c.request('M_S', timeout=5.0))
+            return await asyncio.gather(*futs)
+        finally:
+            await c.stop()
+
+    r3, r1, mark = _run(main())
+    assert isinstance(r3, ResultData) and len(r3) == 3 and len(r1) == 1
+    assert isinstance(mark, MarkData)
+
+
+def test_bad_count_rejected():
+    async def main():
+        with pytest.raises(ValueError):
+            AsyncClient().request('R_C', 'abc')
+
+    _run(main())
+
+
+def test_unanswered_request_slot_is_dropped(emulator, monkeypatch):
+    monkeypatch.setattr('csh.aio.check_request', lambda cmd, args: 'A_R')
+
+    async def main():
+        c = AsyncClient()
+        c.STALE_REQUEST_GRACE = 0.2
+        c.start('127.0.0.1', emulator.port)
+        await c.wait_connected(5.0)
+        try:
+            with pytest.raises(TimeoutError):
+                await c.request('R_S', 'abc', timeout=0.1)
+            await asyncio.sleep(0.4)
+            assert not c._pending['A_R']
+            return await c.request('R_S', 2, timeout=5.0)
+        finally:
+            await c.stop()
+
+    assert len(_run(main())) == 2
+
+
+def test_frames_iterator_and_frame_cb(emulator):
+    async def main():
+        got = []
+        c = AsyncClient(frame_cb=got.append)
+        q = AsyncClient()
+        for client in (c, q):
+            client.start('127.0.0.1', emulator.port)
+            await client.wait_connected(5.0)
+        try:
+            with pytest.raises(RuntimeError):
+                await c.frames().__anext__()
+            c.send_cmd('M_S')
+            q.send_ascii('R_S', 4)
+            frame = await q.frames().__anext__()
+            while not got:
+                await asyncio.sleep(0.01)
+            return frame, got
+        finally:
+            await c.stop()
+            await q.stop()
+
+    frame, got = _run(main())
+    assert frame_cmd(frame) == 'A_R' and got == [b'A_M@3@\r\n']
+
+
+def test_request_while_disconnected_fails():
+    async def main():
+        c = AsyncClient()
+        assert not c.send_cmd('M_S')
+        with pytest.raises(ConnectionError):
+            await c.request('M_S')
+
+    _run(main())
+
+
+def test_stop_fails_pending(silent_server):
+    async def main():
+        c = AsyncClient()
+        c.start('127.0.0.1', silent_server)
+        await c.wait_connected(5.0)
+        fut = c.request('R_S', 1)
+        await c.stop()
+        assert not c.is_connected
+        with pytest.raises(ConnectionError):
+            await fut
+
+    _run(main())
@@ -0,0 +1,86 @@
+import struct
+
+import pytest
+
+from csh.bench_parser import A_M_FRAME, TEXT_LINES, a_d_frame, a_r_frame
+from csh.capture import CONNECT, DATA, DISCONNECT, GAP, CaptureReader, CaptureWriter
+from csh.protocol import frame_cmd
+from csh.transport import ReconnectingClient
+
+
+def _frames():
+    return [a_r_frame(3), A_M_FRAME, *TEXT_LINES, a_d_frame(), a_r_frame(500)]
+
+
+def test_round_trip_two_connections(tmp_path):
+    path = str(tmp_path / 'rx.cap')
+    streams = {1: b''.join(_frames()), 2: b''.join(reversed(_frames()))}
+    with CaptureWriter(path, flush_interval=0.001) as cap:
+        cap.connect(1, 'a')
+        cap.connect(2, 'b')
+        # Interleaved chunks cut mid-frame, from a reused buffer
+        buf = bytearray(7)
+        for off in range(0, max(map(len, streams.values())), 7):
+            for conn_id, data in streams.items():
+                piece = data[off:off + 7]
+                if piece:
+                    buf[:len(piece)] = piece
+                    cap.chunk(conn_id, memoryview(buf)[:len(piece)])
+        cap.disconnect(1, 'remote closed')
+
+    with CaptureReader(path) as rd:
+        got = {1: [], 2: []}
+        for _, conn_id, frame in rd.frames():
+            got[conn_id].append(bytes(frame))
+        st = rd.summary()
+    assert got == {1: _frames(), 2: list(reversed(_frames()))}
+    assert st['connect'] == 2 and st['disconnect'] == 1 and st['gap'] == 0
+    assert st['connections'] == 2
+    assert st['data_bytes'] == sum(map(len, streams.values()))
+
+
+def test_overflow_records_gap(tmp_path):
+    path = str(tmp_path / 'rx.cap')
+    # A long flush interval keeps everything queued until close()
+    with CaptureWriter(path, flush_interval=60.0, max_pending=250) as cap:
+        cap.chunk(1, b'a' * 100)
+        cap.chunk(1, b'b' * 100)
+        cap.chunk(1, b'c' * 100)   # over max_pending: dropped
+        cap.chunk(1, b'd' * 40)
+    assert cap.dropped_bytes == 100
+
+    with CaptureReader(path) as rd:
+        recs = [(kind, bytes(data)) for _, _, kind, data in rd]
+    assert recs == [(DATA, b'a' * 100), (DATA, b'b' * 100),
+                    (GAP, struct.pack('<q', 100)), (DATA, b'd' * 40)]
+
+
+def test_truncated_record_ends_iteration(tmp_path):
+    path = tmp_path / 'rx.cap'
+    with CaptureWriter(str(path)) as cap:
+        cap.connect(1)
+        cap.chunk(1, A_M_FRAME)
+    path.write_bytes(path.read_bytes()[:-1])
+    with CaptureReader(str(path)) as rd:
+        assert [r.kind for r in rd] == [CONNECT]
+
+
+def test_rejects_foreign_file(tmp_path):
+    path = tmp_path / 'x.cap'
+    path.write_bytes(b'not a capture file at all........')
+    with pytest.raises(ValueError):
+        CaptureReader(str(path))
+
+
+def test_client_capture(tmp_path, emulator, connect):
+    path = str(tmp_path / 'rx.cap')
+    with ReconnectingClient(lambda s: None, lambda f: None) as c:
+        connect(c, emulator.port)
+        c.start_capture(path)
+        c.request('R_S', 5, timeout=5.0).result(5.0)
+        c.request('M_S', timeout=5.0).result(5.0)
+    with CaptureReader(path) as rd:
+        kinds = [r.kind for r in rd]
+        cmds = [frame_cmd(f) for _, _, f in rd.frames()]
+    assert kinds[0] == CONNECT and DISCONNECT in kinds
+    assert cmds == ['A_R', 'A_M']
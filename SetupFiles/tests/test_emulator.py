@@ -0,0 +1,142 @@
+import asyncio
+import random
+import socket
+
+import pytest
+
+from csh import emulator as emu
+from csh.decode import A_R_HEADER, decode_frame
+from csh.protocol import FrameParser, RxBuffer, frame_cmd
+
+
+# ==============================
+# Payload Builders
+# ==============================
+@pytest.mark.parametrize('frm_cnt', [0, 1, 7, 1000])
+def test_numpy_and_struct_bodies_are_byte_identical(frm_cnt, monkeypatch):
+    if emu.np is None:
+        pytest.skip('numpy not installed')
+    fast = emu.make_result_body(frm_cnt)
+    monkeypatch.setattr(emu, 'np', None)
+    assert emu.make_result_body(frm_cnt) == fast
+    assert len(fast) == frm_cnt * 48
+
+
+def test_save_result_layout():
+    payload = emu.make_save_result(3, s_time=1234)
+    assert A_R_HEADER.unpack_from(payload)[:2] == (1234, 3)
+    r = decode_frame(b'A_R@3@' + payload + b'@\r\n')
+    assert len(r) == 3
+    assert r.rows(2, 1)[0][0] == (1 * 2) * emu.UM_SCALE
+
+
+def test_payload_cache_evicts_by_bytes():
+    cache = emu.PayloadCache(max_bytes=48 * 15)
+    first = cache.body(10)
+    assert cache.body(10) is first
+    cache.body(5)
+    cache.body(4)                # 19 frames over a 15-frame budget: 10 goes
+    assert cache.stats() == {'entries': 2, 'bytes': 48 * 9, 'max_bytes': 48 * 15,
+                             'hits': 1, 'misses': 3, 'evictions': 1}
+    assert len(cache.body(100)) == 4800   # larger than the budget: built, not kept
+    assert cache.stats()['entries'] == 2
+
+
+# ==============================
+# Command Set
+# ==============================
+def _exchange(port: int, request: bytes, n_frames: int, timeout: float = 5.0):
+    """Send raw request bytes and read back n_frames frames"""
+    ring, parser, out = RxBuffer(), FrameParser(), []
+    with socket.create_connection(('127.0.0.1', port), timeout=timeout) as s:
+        s.sendall(request)
+        while len(out) < n_frames:
+            frame = parser.try_extract(ring)
+            if frame is not None:
+                out.append(bytes(frame))
+                continue
+            data = s.recv(64 * 1024)
+            if not data:
+                break
+            ring.extend(data)
+    return out
+
+
+def test_responses_in_request_order(emulator):
+    out = _exchange(emulator.port, b'P_S@\r\nR_S@2@\r\nD_S@\r\nR_C@0@\r\nM_S@\r\n', 4)
+    assert [frame_cmd(f) for f in out] == ['A_R', 'A_D', 'A_R', 'A_M']
+    assert len(decode_frame(out[0])) == 2 and len(decode_frame(out[2])) == 0
+    assert bytes(decode_frame(out[1]).values) == emu.make_mark_shift()
+    assert out[3] == b'A_M@3@\r\n'
+
+
+@pytest.mark.parametrize('bad', [b'R_S@-1@\r\n', b'R_S@abc@\r\n', b'R_C\r\n'])
+def test_bad_result_request_is_dropped(emulator, bad):
+    logs = []
+    emulator._log_cb = logs.append
+    assert _exchange(emulator.port, bad + b'M_S@\r\n', 1) == [b'A_M@3@\r\n']
+    assert any(l.startswith('[WARN]') for l in logs)
+
+
+def test_status_commands_only_log(emulator):
+    logs = []
+    emulator._log_cb = logs.append
+    out = _exchange(emulator.port, b'B_U@1@\r\nP_L@0@\r\nD_L@1@\r\nA_P@\r\nM_S@\r\n', 1)
+    assert out == [b'A_M@3@\r\n']
+    assert {'Base Up', 'Pogo Pin Unload', 'All Dln load', 'A_P Recieve,'} <= set(logs)
+
+
+# ==============================
+# Network Impairment
+# ==============================
+class _RecordingWriter:
+    def __init__(self):
+        self.chunks = []
+        self.aborted = False
+        self.transport = self
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+
+    async def drain(self):
+        pass
+
+    def abort(self):
+        self.aborted = True
+
+
+def _through_link(imp, frames, settle: float = 0.2):
+    """Chunks an _ImpairedLink writes for the given frames (tuples of parts)"""
+    async def main():
+        w = _RecordingWriter()
+        link = emu._ImpairedLink(w, imp, random.Random(imp.seed))
+        for parts in frames:
+            link.send(parts)
+        await asyncio.sleep(settle)
+        link.close()
+        return w
+
+    return asyncio.run(main())
+
+
+def test_segment_size_splits_writes():
+    frame = (b'A_R@2@', emu.make_save_result(2), b'@\r\n')
+    w = _through_link(emu.Impairment(segment_size=5), [frame])
+    assert max(len(c) for c in w.chunks) == 5
+    assert b''.join(w.chunks) == b''.join(frame)
+
+
+def test_jitter_never_reorders():
+    frames = [(f'A_M@{i}@\r\n'.encode('ascii'),) for i in range(20)]
+    w = _through_link(emu.Impairment(jitter_s=0.02, seed=3), frames)
+    assert w.chunks == [f[0] for f in frames]
+
+
+def test_seeded_disconnect_is_reproducible():
+    frame = (b'A_R@10@', emu.make_save_result(10), b'@\r\n')
+    imp = emu.Impairment(disconnect_prob=1.0, seed=5)
+    cuts = [len(b''.join(_through_link(imp, [frame]).chunks)) for _ in range(2)]
+    rng = random.Random(5)
+    rng.random()                 # the disconnect draw, then the cut point
+    assert cuts[0] == cuts[1] == rng.randrange(sum(len(p) for p in frame))
+    assert _through_link(imp, [frame]).aborted
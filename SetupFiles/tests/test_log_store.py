@@ -0,0 +1,59 @@
+from collections import deque
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('tkinter')
+from client_ui import App, LogStore
+
+
+def _store(n: int, max_lines: int) -> LogStore:
+    store = LogStore(max_lines)
+    store.extend(f'line {i}\r\n' for i in range(n))
+    return store
+
+
+def test_ring_keeps_the_newest_lines():
+    store = _store(10, 4)
+    assert len(store) == 4 and store.total == 10
+    assert [store[i] for i in range(4)] == [f'line {i}\r\n' for i in range(6, 10)]
+    assert store.window(-1, 3) == ['line 6\r\n', 'line 7\r\n']
+    assert store.window(3, 10) == ['line 9\r\n']
+
+
+def test_find_wraps_around():
+    store = _store(10, 4)
+    assert store.find('line 7') == 1
+    assert store.find('line 7', start=2) == 1
+    assert store.find('line 1\r') == -1
+    store.clear()
+    assert len(store) == 0 and store.find('line') == -1
+
+
+def test_export(tmp_path):
+    path = tmp_path / 'log.txt'
+    _store(5, 3).export(str(path))
+    assert path.read_bytes() == b'line 2\r\nline 3\r\nline 4\r\n'
+
+
+def _app(store: LogStore, top: int, hit: int, queued: int):
+    app = SimpleNamespace(
+        LOG_TICK_MS=App.LOG_TICK_MS, LOG_MAX_LINES_PER_TICK=App.LOG_MAX_LINES_PER_TICK,
+        _log_q=deque(f'new {i}\r\n' for i in range(queued)), _log_store=store,
+        _log_top=top, _log_hit=hit, rendered=0, _drain_log=None)
+    app._render_log = lambda: setattr(app, 'rendered', app.rendered + 1)
+    app.after = lambda ms, fn: None
+    return app
+
+
+@pytest.mark.parametrize('hit, queued, want_top, want_hit', [
+    (3, 2, 1, 1),      # two lines dropped: view and hit move up with their lines
+    (1, 2, 1, -1),     # the hit line itself was dropped
+    (-1, 2, 1, -1),    # no hit stays no hit
+    (3, 0, 3, 3),      # nothing queued: nothing moves
+])
+def test_drain_shifts_top_and_hit(hit, queued, want_top, want_hit):
+    app = _app(_store(4, 4), top=3, hit=hit, queued=queued)
+    App._drain_log(app)
+    assert (app._log_top, app._log_hit) == (want_top, want_hit)
+    assert app.rendered == (1 if queued else 0)
@@ -0,0 +1,102 @@
+import json
+import random
+import urllib.request
+
+import pytest
+
+from csh.metrics import Histogram, Registry
+
+
+# ==============================
+# Histogram
+# ==============================
+def test_small_values_are_exact():
+    h = Histogram()
+    for v in range(64):
+        h.record(v)
+    assert [h.quantile(q) for q in (0.0, 0.5, 1.0)] == [0, 31, 63]
+    assert (h.count, h.sum, h.min, h.max) == (64, 2016, 0, 63)
+
+
+def test_quantiles_within_bucket_error():
+    rng = random.Random(1)
+    values = sorted(int(rng.lognormvariate(13, 1.5)) for _ in range(20000))
+    h = Histogram()
+    for v in values:
+        h.record(v)
+    for q in Histogram.QUANTILES:
+        exact = values[int(q * len(values) + 0.5) - 1]
+        assert exact <= h.quantile(q) <= exact * (1 + 1 / Histogram.SUB_BUCKETS)
+
+
+def test_get_applies_scale_and_reset_clears():
+    h = Histogram(scale=1e-9)
+    h.record(2_000_000_000)
+    h.record(-5)             # clamped to 0
+    st = h.get()
+    assert st['count'] == 2 and st['min'] == 0 and st['max'] == 2.0
+    assert st['p99.9'] <= 2.0
+    h.reset()
+    assert h.get()['count'] == 0 and h.quantile(0.5) == 0
+
+
+# ==============================
+# Registry
+# ==============================
+def _registry():
+    r = Registry()
+    r.counter('csh_rx_bytes_total', 'Bytes received', station='line"1\\').inc(3)
+    r.counter('csh_rx_bytes_total', station='b').inc()
+    r.gauge('csh_connected', '1 while connected', lambda: 1, station='b')
+    h = r.histogram('csh_request_latency_seconds', 'Latency', scale=1e-9, station='b')
+    for v in (1000, 2000, 3000):
+        h.record(v)
+    return r
+
+
+def test_prometheus_text_format():
+    assert _registry().to_prometheus().splitlines() == [
+        '# HELP csh_connected 1 while connected',
+        '# TYPE csh_connected gauge',
+        'csh_connected{station="b"} 1',
+        '# HELP csh_request_latency_seconds Latency',
+        '# TYPE csh_request_latency_seconds summary',
+        'csh_request_latency_seconds{station="b",quantile="0.5"} 2.015e-06',
+        'csh_request_latency_seconds{station="b",quantile="0.9"} 3e-06',
+        'csh_request_latency_seconds{station="b",quantile="0.99"} 3e-06',
+        'csh_request_latency_seconds{station="b",quantile="0.999"} 3e-06',
+        'csh_request_latency_seconds_sum{station="b"} 6e-06',
+        'csh_request_latency_seconds_count{station="b"} 3',
+        '# HELP csh_rx_bytes_total Bytes received',
+        '# TYPE csh_rx_bytes_total counter',
+        'csh_rx_bytes_total{station="b"} 1',
+        'csh_rx_bytes_total{station="line\\"1\\\\"} 3',
+    ]
+
+
+def test_same_name_and_labels_share_a_metric():
+    r = Registry()
+    assert r.counter('n', station='a') is r.counter('n', station='a')
+    assert r.counter('n', station='a') is not r.counter('n', station='b')
+    with pytest.raises(ValueError):
+        r.gauge('n', station='c')
+
+
+def test_unregister_and_failing_callbacks():
+    r = _registry()
+    r.gauge('csh_broken', fn=lambda: 1 / 0)
+    r.unregister(station='b')
+    assert r.snapshot() == {'csh_rx_bytes_total{station="line\\"1\\\\"}': 3}
+
+
+def test_http_endpoint():
+    srv = _registry().serve(port=0)
+    try:
+        base = f'http://{srv.host}:{srv.port}'
+        with urllib.request.urlopen(base + '/metrics', timeout=5) as resp:
+            assert resp.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            assert b'csh_connected{station="b"} 1\n' in resp.read()
+        with urllib.request.urlopen(base + '/metrics.json', timeout=5) as resp:
+            assert json.load(resp)['csh_connected{station="b"}'] == 1
+    finally:
+        srv.close()
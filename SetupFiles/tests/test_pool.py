@@ -0,0 +1,85 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from csh.pool import StationPool
+from csh.protocol import frame_cmd
+
+
+@pytest.fixture
+def blackhole_port():
+    """Listener with a full accept backlog: further SYNs go unanswered"""
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.bind(('127.0.0.1', 0))
+    srv.listen(0)
+    port = srv.getsockname()[1]
+    fill = []
+    for _ in range(4):
+        c = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        c.setblocking(False)
+        c.connect_ex(('127.0.0.1', port))
+        fill.append(c)
+    time.sleep(0.1)
+    yield port
+    for c in fill:
+        c.close()
+    srv.close()
+
+
+def test_broadcast_and_routing(emulator, wait_for):
+    got = []
+    lock = threading.Lock()
+
+    def on_frame(name, frame):
+        with lock:
+            got.append((name, frame_cmd(frame)))
+
+    with StationPool(on_frame) as pool:
+        pool.add('a', '127.0.0.1', emulator.port)
+        pool.add('b', '127.0.0.1', emulator.port)
+        pool.start()
+        assert wait_for(lambda: pool.is_connected('a') and pool.is_connected('b'))
+        pool.broadcast('M_S')
+        pool.send_ascii('a', 'R_S', 2)
+        pool.send_cmd('b', 'D_S')
+        assert wait_for(lambda: len(got) == 4)
+        assert sorted(got) == [('a', 'A_M'), ('a', 'A_R'), ('b', 'A_D'), ('b', 'A_M')]
+        total = pool.stats()['total']
+        assert total['stations'] == 2 and total['connected'] == 2
+        assert total['frames_rx'] == 4 and total['tx_queued'] == 0
+        pool.remove('b')
+        assert pool.names == ['a']
+        pool.broadcast('M_S')
+        assert wait_for(lambda: len(got) == 5)
+        assert got[-1] == ('a', 'A_M')
+
+
+def test_send_to_disconnected_station_is_logged():
+    logs = []
+    with StationPool(lambda name, frame: None, logs.append) as pool:
+        pool.add('a', '127.0.0.1', 1)
+        pool.send_cmd('a', 'M_S')
+    assert any('Not connected' in l for l in logs)
+
+
+def test_connect_times_out(blackhole_port, wait_for):
+    logs = []
+    pool = StationPool(lambda name, frame: None, logs.append)
+    pool.CONNECT_TIMEOUT = 0.2
+    pool.add('a', '127.0.0.1', blackhole_port)
+    pool.start()
+    try:
+        assert wait_for(lambda: sum('timed out' in l for l in logs) >= 2, 5.0)
+        assert not pool.is_connected('a')
+    finally:
+        pool.close()
+
+
+def test_close_releases_selector_and_wakeup_sockets():
+    with StationPool(lambda name, frame: None) as pool:
+        pool.start()
+    assert pool._wake_r.fileno() == -1 and pool._wake_w.fileno() == -1
+    with pytest.raises((RuntimeError, ValueError, OSError)):
+        pool._sel.select(0)
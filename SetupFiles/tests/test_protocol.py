@@ -0,0 +1,141 @@
+import math
+import struct
+import sys
+
+import pytest
+
+from csh import decode
+from csh.bench_parser import A_M_FRAME, TEXT_LINES, a_d_frame, a_r_frame
+from csh.decode import MarkData, ResultData, ShiftData, TextLine, decode_frame
+from csh.protocol import FrameParser, RxBuffer, encode_ascii, encode_cmd, frame_cmd
+
+CHUNK_SIZES = (1, 2, 3, 5, 64, 1460, 64 * 1024, 1 << 30)
+
+
+def _a_d_with_tails() -> bytes:
+    # Every double is '@\r\n' followed by padding: the parser must not stop on them
+    payload = (b'@\r\n@\r\n\x00\x00') * 4
+    return b'A_D@4@' + payload + b'@\r\n'
+
+
+def _a_r_with_tails(frm_cnt: int) -> bytes:
+    header = struct.pack('<qi4d', 0, frm_cnt, 1000.0, 2.7, 2.7, 10.0)
+    body = (b'@\r\n' * 16) * frm_cnt   # 48 bytes per frame
+    return f'A_R@{frm_cnt}@'.encode('ascii') + header + body + b'@\r\n'
+
+
+def _stream():
+    return [
+        b'Base Up\r\n',
+        a_r_frame(3),
+        _a_d_with_tails(),
+        A_M_FRAME,
+        _a_r_with_tails(2),
+        *TEXT_LINES,
+        a_d_frame(),
+        _a_r_with_tails(0),
+        a_r_frame(1000),
+        b'P_S@\r\n',
+        A_M_FRAME,
+    ]
+
+
+def _feed(stream: bytes, chunk: int, views: bool, zero_copy: bool):
+    ring, parser = RxBuffer(), FrameParser(views=views)
+    out = []
+    for off in range(0, len(stream), chunk):
+        data = stream[off:off + chunk]
+        if zero_copy:
+            ring.write_view(len(data))[:len(data)] = data
+            ring.commit(len(data))
+        else:
+            ring.extend(data)
+        while True:
+            frame = parser.try_extract(ring)
+            if frame is None:
+                break
+            out.append(bytes(frame))
+    return out, ring, parser
+
+
+@pytest.mark.parametrize('zero_copy', [False, True])
+@pytest.mark.parametrize('views', [False, True])
+@pytest.mark.parametrize('chunk', CHUNK_SIZES)
+def test_mixed_stream_any_chunking(chunk, views, zero_copy):
+    frames = _stream()
+    out, ring, parser = _feed(b''.join(frames), chunk, views, zero_copy)
+    assert out == frames
+    assert len(ring) == 0
+    assert parser.resyncs == 0
+
+
+def test_partial_frame_waits_for_more():
+    frame = a_r_frame(10)
+    out, ring, _ = _feed(frame[:-1], 1 << 30, False, False)
+    assert out == []
+    assert len(ring) == len(frame) - 1
+
+
+# Like the C# parser, a resync drops one byte and the rest reads as a text
+# line up to the next CRLF; framing is back in step after that line
+def test_bad_tail_resyncs():
+    broken = a_r_frame(1)[:-3] + b'XXX'
+    out, _, parser = _feed(broken + A_M_FRAME + A_M_FRAME, 7, False, False)
+    assert out[-1] == A_M_FRAME
+    assert parser.resyncs == 1
+
+
+def test_bad_count_resyncs():
+    out, _, parser = _feed(b'A_R@-1@' + A_M_FRAME + A_M_FRAME, 1, False, False)
+    assert out == [b'_R@-1@A_M@3@\r\n', A_M_FRAME]
+    assert parser.resyncs == 1
+
+
+@pytest.mark.parametrize('count', [b'9999999999', b'2147483648', b'1_0', b'+5', b' 5', b''])
+def test_count_outside_int32_digits_resyncs(count):
+    out, ring, parser = _feed(b'A_R@' + count + b'@' + A_M_FRAME + A_M_FRAME, 1 << 30, False, False)
+    assert out[-1] == A_M_FRAME
+    assert parser.resyncs == 1
+    assert len(ring) == 0
+
+
+def test_decode_frames():
+    r = decode_frame(_a_r_with_tails(2))
+    assert isinstance(r, ResultData) and len(r) == 2
+    assert isinstance(decode_frame(_a_d_with_tails()), ShiftData)
+    m = decode_frame(A_M_FRAME)
+    assert isinstance(m, MarkData) and m.mark_id == '3'
+    assert isinstance(decode_frame(b'Base Up\r\n'), TextLine)
+
+
+def test_result_copy_detaches_from_buffer():
+    buf = bytearray(a_r_frame(4))
+    r = decode_frame(memoryview(buf))
+    kept = r.copy()
+    before = kept.rows(0, 4)
+    buf[:] = bytes(len(buf))
+    assert kept.rows(0, 4) == before
+
+
+def test_decode_without_numpy(monkeypatch):
+    frames = (a_r_frame(7), _a_r_with_tails(2), a_d_frame())
+    expect = [decode_frame(f) for f in frames]
+    monkeypatch.setitem(sys.modules, 'numpy', None)   # import numpy raises ImportError
+    monkeypatch.setattr(decode, 'np', None)
+    monkeypatch.setattr(decode, '_np_tried', False)
+    r7, r2, shift = [decode_frame(f) for f in frames]
+    assert decode._numpy() is None and isinstance(r7.axes, list)
+    for got, want in ((r7, expect[0]), (r2, expect[1])):
+        assert got.frame_count == want.frame_count and len(got) == len(want)
+        assert got.rows(0, len(got)) == [tuple(row) for row in want.rows(0, len(want))]
+        assert got.axis_stats() == pytest.approx(want.axis_stats())
+        assert got.copy().rows(0, 2) == got.rows(0, 2)
+    assert shift.values.tolist() == expect[2].values.tolist()
+    assert all(math.isnan(v) for v in decode_frame(a_r_frame(0)).axis_stats()[0])
+
+
+def test_encoding():
+    assert encode_cmd('P_S') == b'P_S@\r\n'
+    assert encode_ascii('R_S', 100) == b'R_S@100@\r\n'
+    assert frame_cmd(b'A_M@3@\r\n') == 'A_M'
+    assert frame_cmd(b'Base Up\r\n') == ''
@@ -0,0 +1,201 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from csh.decode import MarkData, ResultData
+from csh.protocol import RxBuffer
+from csh.transport import ReconnectingClient, SendQueue
+
+
+# ==============================
+# Send Queue
+# ==============================
+def _recorder():
+    done = []
+    return done, lambda ex: done.append(ex)
+
+
+def test_send_queue_drop_new():
+    q = SendQueue(2, SendQueue.DROP_NEW)
+    assert q.put(b'a') and q.put(b'b')
+    assert not q.put(b'c')
+    assert q.dropped == 1
+    assert [d for d, _ in q.take_all(0)] == [b'a', b'b']
+
+
+def test_send_queue_drop_old_fails_evicted():
+    q = SendQueue(2, SendQueue.DROP_OLD)
+    done, on_done = _recorder()
+    q.put(b'a', on_done)
+    q.put(b'b')
+    assert q.put(b'c')
+    assert q.dropped == 1
+    assert len(done) == 1 and isinstance(done[0], BufferError)
+    assert [d for d, _ in q.take_all(0)] == [b'b', b'c']
+
+
+def test_send_queue_block_times_out():
+    q = SendQueue(1, SendQueue.BLOCK, block_timeout=0.05)
+    q.put(b'a')
+    t0 = time.monotonic()
+    assert not q.put(b'b')
+    assert 0.04 <= time.monotonic() - t0 < 1.0
+    assert q.dropped == 1
+
+
+def test_send_queue_block_waits_for_room():
+    q = SendQueue(1, SendQueue.BLOCK, block_timeout=5.0)
+    q.put(b'a')
+    threading.Timer(0.05, q.take_all, (0,)).start()
+    assert q.put(b'b')
+    assert [d for d, _ in q.take_all(0)] == [b'b']
+
+
+def test_send_queue_wake_and_fail_all():
+    q = SendQueue()
+    threading.Timer(0.05, q.wake).start()
+    assert q.take_all(5.0) == []
+    done, on_done = _recorder()
+    q.put(b'a', on_done)
+    q.fail_all(ConnectionError('stopped'))
+    assert len(q) == 0 and isinstance(done[0], ConnectionError)
+
+
+def test_send_queue_rejects_unknown_policy():
+    with pytest.raises(ValueError):
+        SendQueue(overflow='drop_all')
+
+
+# ==============================
+# Reconnecting Client
+# ==============================
+@pytest.fixture
+def client():
+    c = ReconnectingClient(lambda s: None, lambda f: None)
+    yield c
+    c.close()
+
+
+def test_send_while_disconnected_fails(client):
+    done, on_done = _recorder()
+    assert not client.send_ascii('R_S', 1, on_done=on_done)
+    assert isinstance(done[0], RuntimeError)
+    assert client.stats()['send_errors'] == 1
+
+
+def test_requests_resolve_in_order(client, emulator, connect):
+    connect(client, emulator.port)
+    futs = [client.request('R_S', n, timeout=5.0) for n in (1, 100, 2)]
+    futs.append(client.request('M_S', timeout=5.0))
+    results = [f.result(5.0) for f in futs]
+    assert [len(r) for r in results[:3]] == [1, 100, 2]
+    assert all(isinstance(r, ResultData) for r in results[:3])
+    assert isinstance(results[3], MarkData)
+
+
+def test_send_completion_reported(client, emulator, connect):
+    connect(client, emulator.port)
+    sent = threading.Event()
+    done = []
+    assert client.send_ascii('M_S', on_done=lambda ex: (done.append(ex), sent.set()))
+    assert sent.wait(5.0)
+    assert done == [None]
+
+
+def test_request_times_out_while_idle(client, silent_server, connect):
+    connect(client, silent_server)
+    t0 = time.monotonic()
+    fut = client.request('R_S', 1, timeout=0.2)
+    with pytest.raises(TimeoutError):
+        fut.result(5.0)
+    assert time.monotonic() - t0 < 2.0
+
+
+def test_request_without_response_frame_rejected(client):
+    with pytest.raises(ValueError):
+        client.request('P_S')
+
+
+@pytest.mark.parametrize('args', [(), ('abc',), (-1,), ('1_0',), (2 ** 31,)])
+def test_request_with_bad_count_rejected(client, args):
+    with pytest.raises(ValueError):
+        client.request('R_S', *args)
+
+
+def test_unanswered_request_slot_is_dropped(client, emulator, connect, monkeypatch):
+    # Bypass validation to send a request the emulator drops ("arg parse fail")
+    monkeypatch.setattr('csh.transport.check_request', lambda cmd, args: 'A_R')
+    client.STALE_REQUEST_GRACE = 0.3
+    connect(client, emulator.port)
+    lost = client.request('R_S', 'abc', timeout=0.1)
+    with pytest.raises(TimeoutError):
+        lost.result(5.0)
+    time.sleep(0.5)
+    assert not client._pending['A_R']
+    assert len(client.request('R_S', 1, timeout=5.0).result(5.0)) == 1
+
+
+def test_late_response_keeps_its_slot(client, emulator, connect):
+    connect(client, emulator.port)
+    slow = client.request('R_S', 200_000, timeout=0.001)
+    fast = client.request('R_S', 1, timeout=5.0)
+    with pytest.raises(TimeoutError):
+        slow.result(5.0)
+    assert len(fast.result(5.0)) == 1
+
+
+def test_stop_is_prompt_and_fails_pending(client, silent_server, connect):
+    connect(client, silent_server)
+    fut = client.request('R_S', 1)
+    t0 = time.monotonic()
+    client.stop()
+    assert time.monotonic() - t0 < 1.0
+    assert not client.is_connected
+    with pytest.raises(ConnectionError):
+        fut.result(1.0)
+
+
+def test_stop_while_reconnecting_is_prompt(client):
+    client.start('127.0.0.1', 1)   # nothing listens: the client sits in its backoff
+    time.sleep(0.2)
+    t0 = time.monotonic()
+    client.stop()
+    assert time.monotonic() - t0 < 1.0
+
+
+def test_close_releases_wakeup_sockets(emulator, connect):
+    with ReconnectingClient(lambda s: None, lambda f: None) as c:
+        connect(c, emulator.port)
+    assert not c.is_connected
+    assert c._wake_r.fileno() == -1 and c._wake_w.fileno() == -1
+    c.close()   # idempotent
+
+
+def test_reconnects_after_connection_loss(client, emulator, connect, wait_for):
+    connect(client, emulator.port)
+    assert client.request('M_S', timeout=5.0).result(5.0)
+    client._sock.shutdown(socket.SHUT_RDWR)   # drop the connection from under the client
+    assert wait_for(lambda: client.stats()['reconnects'] >= 1 and client.is_connected)
+    assert isinstance(client.request('M_S', timeout=5.0).result(5.0), MarkData)
+
+
+@pytest.mark.parametrize('max_frame_bytes, regrown', [(None, False), (1024, True)])
+def test_large_frame_reserved_once(client, emulator, connect, monkeypatch, max_frame_bytes, regrown):
+    moved = []
+    reserve = RxBuffer.reserve
+
+    def counting_reserve(ring, n):
+        if ring._wr + n > len(ring._buf):
+            moved.append(len(ring))
+        reserve(ring, n)
+
+    monkeypatch.setattr(RxBuffer, 'reserve', counting_reserve)
+    if max_frame_bytes is not None:
+        client.MAX_FRAME_BYTES = max_frame_bytes
+    connect(client, emulator.port)
+    moved.clear()
+    assert len(client.request('R_S', 200_000, timeout=10.0).result(10.0)) == 200_000
+    # Within MAX_FRAME_BYTES the frame gets its room before the payload arrives
+    assert (sum(moved) > 1024 * 1024) == regrown